@@ -10,6 +10,7 @@ import datetime
 import argparse
 import resource
 from collections import defaultdict
+from hyfd_libs.fdfile import FDFile
 
 def l_close(L, new_closure):
     '''
@@ -77,6 +78,9 @@ def minimal_cover(L):
     return L
 
 def read_rules(path):
+    if path.endswith('.fds'):
+        with FDFile(path) as fds:
+            return [(set(ant), set(con)) for ant, con in fds]
     with open(path, 'r') as fin:
         # return [(set(ant), set(con)) for ant, con in json.load(fin)]
         return [(set(ant), set(con)) for ant, con in json.load(fin)]
@@ -7,21 +7,34 @@ Dataset ncvoter has this kind of FDs and yields different results.
 from __future__ import print_function
 
 import sys
+import json
 import logging
 import time
 import argparse
+import itertools
 from hyfd_libs.utils import Stats, Output
 from hyfd_libs.fd_tree import FDTree
 from hyfd_libs.pli import PLI
-from hyfd_libs.efficiency import Efficiency
+from hyfd_libs.sampling import run_window, run_strategy, match, relevant, WINDOW, RANDOM, FOCUSED, STRATEGIES
+from hyfd_libs.efficiency import Efficiency, RandomEfficiency, FocusedEfficiency
 from hyfd_libs.boolean_tree import BooleanTree
+from hyfd_libs.distributed import Coordinator, GlobalEncoder
+from hyfd_libs.disk import DiskStore, BUFFER_ROWS
+from hyfd_libs.closure import ClosureIndex
+from hyfd_libs.progress import ProgressReporter, Cancelled
+from hyfd_libs.memory import MemoryAccounting, STRUCTURES
+from hyfd_libs.backends import open_backend
+from hyfd_libs.parallel import build_plis
+from hyfd_libs.cache import ResultCache, content_hash, fingerprint
+from hyfd_libs.controller import AdaptiveController
+from hyfd_libs.verify import PartitionCache
 import resource
 
 FORMAT = "[%(filename)s:%(lineno)s - %(funcName)20s() ] %(message)s"
 LOG_FILENAME = 'hyfd.log'
 
 # logging.basicConfig(filename=LOG_FILENAME, format=FORMAT, level=logging.INFO)
-# logger = logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
 
 INVALID_FDS_THRESHOLD = 0.01
 EFFICIENCY_THRESHOLD_INIT = 0.01
@@ -37,17 +50,21 @@ def read_csv(path, separator=','):
     mat = [list(map(str, line.replace('\n','').split(separator))) for line in open(path, 'r', encoding='utf8').readlines()]
     return mat
 
-def build_pli(lst):
-    '''
-    Generates a PLI (position list indexes) given a column in the database (lst) (partition)
-    Example:
-    [0,1,0,1,1,2] -> [[1,3,4], [0,2]]
-    PLIs are ordered by number of indices in each component and filtered of singletons
-    '''
-    hashes = {}
-    for i, j in enumerate(lst):
-        hashes.setdefault(j, set([])).add(i)
-    return sorted([sorted(i) for i in hashes.values() if len(i) > 1], key = lambda k: len(k), reverse=True)
+def log_progress(event):
+    eta = ' | ETA:{}s'.format(round(event['eta'], 1)) if event['eta'] is not None else ''
+    level = ' level {}'.format(event['level']) if event['level'] is not None else ''
+    total = '/{}'.format(event['total']) if event['total'] is not None else ''
+    logging.info("Progress: {}{} {}{} | N_FDS:{} | N_NON_FDS:{}{}".format(event['phase'], level, event['done'], total, event['n_fds'], event['n_non_fds'], eta))
+
+def column_ids(text):
+    return sorted(set(int(att) for att in text.split(',')))
+
+def strategies(text):
+    names = [name for name in text.split(',') if name != '']
+    for name in names:
+        if name not in STRATEGIES:
+            raise argparse.ArgumentTypeError('Unknown sampling strategy {}, choose among {}'.format(name, ','.join(STRATEGIES)))
+    return names
 
 def transpose(lst, n_rows):
     return [[row[j] for row in lst] for j in range(n_rows)]
@@ -57,34 +74,59 @@ class HyFd(object):
     def __init__(self, args):
         self.natts = 0
         self.nrecs = 0
+        memory = getattr(args, 'memory', None)
+        self.memory = MemoryAccounting(memory) if memory else None
         
+        # THE CONTENT IS HASHED ONCE FOR THE KEYS OF THE ENCODED COLUMNS AND OF THE RESULTS
+        self.content = content_hash(args.db_path) if getattr(args, 'cache', None) else None
         t0 = time.time()
-        self.records = read_csv(args.db_path, separator=args.separator)
-        if args.ignore_headers:
-            headers = self.records[0]
-            del self.records[0]
+        self.records = self.load(args)
         self.reading_time = time.time()-t0
 
         self.att_order_map = []
         self.non_fds = None
         self.fds = None
+        # FDs KNOWN TO HOLD, VALIDATION DOES NOT CHECK THEM
+        self.known_fds = None
         self.current_level = None
         self.current_level_number = None
         self.plis = None
         self.pli_records = None
         self.comparison_suggestions = []
+        # SUGGESTIONS ALREADY SAMPLED AROUND BY THE FOCUSED STRATEGY
+        self.focused_suggestions = 0
         self.efficiency_queue = None
         self.efficiency_threshold = args.efft
         self.learning_factor = args.lf
         self.invalid_fds_threshold = args.ift
         self.efficiency_limit = args.el
+        self.output_keys = getattr(args, 'keys', False)
+        self.rhs = getattr(args, 'rhs', None)
+        self.max_lhs = getattr(args, 'max_lhs', None)
+        self.jobs = getattr(args, 'jobs', 1)
+        self.strategies = getattr(args, 'sampling', None) or [WINDOW]
+        self.controller = AdaptiveController() if getattr(args, 'adaptive', False) else None
+        cache = getattr(args, 'cache', None)
+        self.cache = ResultCache(cache) if cache else None
+        # TARGETED AND CAPPED RUNS ONLY KNOW PART OF THE FDs AND ARE CACHED APART
+        options = [args.separator, args.ignore_headers, getattr(args, 'table', None)] + ([sorted(self.rhs)] if self.rhs is not None else [])
+        options += [{'max_lhs': self.max_lhs}] if self.max_lhs is not None else []
+        self.fingerprint = fingerprint(self.content, *options) if cache else None
+        self.progress = ProgressReporter(getattr(args, 'progress', None), getattr(args, 'cancel', None), counts=self.counts)
+        # CALLED WITH THE NUMBER OF THE ITERATION AND THE MINER AFTER EACH ITERATION
+        self.on_iteration = getattr(args, 'iteration', None)
         self.oldcomps = 0
 
         self.row_checks = 0
+        self.phase_times = {'sampling': 0.0, 'induction': 0.0, 'validation': 0.0}
 
         self.go_on = True
+        self.sampling_exhausted = False
         
-        self.output = Output(logging, args.db_path)
+        self.output = Output(logging, args.db_path, binary=getattr(args, 'binary', False))
+        self.column_names = None
+        if self.output.binary_path is not None:
+            self.column_names = open_backend(args.db_path, args.separator, args.ignore_headers, getattr(args, 'table', None)).column_names
         log_headers = [
             'Database',
             'Path',
@@ -97,12 +139,31 @@ class HyFd(object):
             'Memory',
             'Status',
             'row_check',
-        ]
+        ] + ['Mem_{}'.format(structure) for structure in STRUCTURES] + ['Mem_traced']
         self.stats = Stats(logging, log_headers, args.restart)
 
-        self.execute()
+        if getattr(args, 'discover', True):
+            self.execute()
+        else:
+            self.preproc()
         
         
+    def load(self, args):
+        '''
+        Reads the database in args.db_path column by column (see hyfd_libs/backends.py)
+        returns a list with one array of value codes per column
+        '''
+        backend = open_backend(args.db_path, args.separator, args.ignore_headers, getattr(args, 'table', None))
+        if getattr(args, 'cache', None) is None:
+            return list(backend.columns())
+        # THE ENCODED COLUMNS ONLY DEPEND ON THE DATA AND HOW IT IS PARSED
+        cache = ResultCache(args.cache)
+        key = fingerprint(self.content, args.separator, args.ignore_headers, getattr(args, 'table', None))
+        columns = cache.load_codes(key)
+        if columns is None:
+            columns = list(backend.columns())
+            cache.save_codes(key, columns)
+        return columns
 
     def get_fds(self):
         '''
@@ -110,7 +171,85 @@ class HyFd(object):
         returns (list, list)
         '''
         for lhs, rhs in self.fds.read_fds():
-            yield ([self.plis[i].att for i in lhs], [self.plis[i].att for i in rhs])
+            yield ([self.att_order_map[i] for i in lhs], [self.att_order_map[i] for i in rhs])
+
+    def get_keys(self):
+        '''
+        Yields the minimal unique column combinations. Once all FDs are
+        discovered these are the candidate keys of the cover, or none if
+        the database has duplicate rows. Before that, and in targeted or
+        capped runs, only the keys found as a by-product of validation
+        returns list
+        '''
+        if self.go_on or self.rhs is not None or self.max_lhs is not None:
+            keys = self.fds.read_keys()
+        elif self.nrecs <= 1:
+            # THE STRIPPED PLIs OF A SINGLE RECORD ARE EMPTY, THE EMPTY SET IS ITS KEY
+            keys = [[]]
+        else:
+            keys = ClosureIndex.from_tree(self.fds).candidate_keys()
+            first = next(keys)
+            if not self.is_unique(first):
+                # DUPLICATE ROWS, NO COMBINATION OF COLUMNS IS UNIQUE
+                return
+            keys = itertools.chain([first], keys)
+        for key in keys:
+            yield sorted(self.att_order_map[i] for i in key)
+
+    def is_unique(self, lhs):
+        '''
+        True if no two records share the values of lhs, given by PLI positions
+        '''
+        if not bool(lhs):
+            return self.nrecs <= 1
+        s_lhs = sorted(lhs)
+        for cluster in self.plis[s_lhs[0]]:
+            signatures = set()
+            for ti in cluster:
+                signature = tuple(self.pli_records[ti][x] for x in s_lhs)
+                if -1 in signature:
+                    continue
+                if signature in signatures:
+                    return False
+                signatures.add(signature)
+        return True
+
+    @property
+    def targets(self):
+        '''
+        Positions in the PLIs of the attributes in self.rhs,
+        the only right hand sides discovered. None if all attributes are
+        returns list
+        '''
+        if self.rhs is None:
+            return None
+        unknown = set(self.rhs) - set(self.att_order_map)
+        if bool(unknown):
+            raise ValueError('Unknown RHS attributes {}, the database has {} attributes'.format(sorted(unknown), self.natts))
+        return [x for x, att in enumerate(self.att_order_map) if att in self.rhs]
+
+    def closure_index(self, **kwargs):
+        '''
+        Index for closure, implication and candidate key queries
+        over the discovered FDs, with the original attribute ids
+        returns ClosureIndex
+        '''
+        return ClosureIndex.from_tree(self.fds, self.att_order_map, **kwargs)
+
+    def holds(self, lhs, rhs):
+        '''
+        Checks lhs -> rhs on the records with refines,
+        attributes given by their original ids
+        returns bool
+        '''
+        if rhs in lhs:
+            return True
+        position = dict((att, x) for x, att in enumerate(self.att_order_map))
+        n_suggestions = len(self.comparison_suggestions)
+        result = bool(self.refines([position[att] for att in set(lhs)], [position[rhs]], keys=False))
+        # THE PAIRS ARE ONLY SUGGESTED TO SAMPLING IN DISCOVERY, QUERIES DO NOT KEEP THEM
+        del self.comparison_suggestions[n_suggestions:]
+        return result
 
 
     def execute(self):
@@ -120,42 +259,256 @@ class HyFd(object):
         t0 = time.time()
         status = ''
         
-        self.preproc()
+        if self.plis is None:
+            self.preproc()
+            self.account('preproc')
+        entry = self.cache.load(self.fingerprint) if self.cache is not None else None
+        if entry is not None and self.restore(entry):
+            # THE FDs OF THIS DATABASE ARE ALREADY KNOWN
+            self.go_on = False
+            self.output.write(self.get_fds(), self.natts, self.metadata())
+            if self.output_keys:
+                self.output.write_keys(self.get_keys())
+            self.execution_time = time.time()-t0
+            status = 'cached'
         iteration = 1
         try:
             while self.go_on:
-                self.sampling()
-                self.induction()
-                self.validation()
+                self.iterate()
                 n_fds = self.fds.n_fds
                 # print("Iteration:{}, N_FDS:{}, TIME:{}\n".format(iteration, n_fds, time.time()-t0 ))
                 logging.info("Iteration:{}, N_FDS:{}, TIME:{}".format(iteration, n_fds, time.time()-t0 ))
+                if self.on_iteration is not None:
+                    self.on_iteration(iteration, self)
                 iteration+=1
-                self.output.write(self.get_fds())
+                self.output.write(self.get_fds(), self.natts, self.metadata())
+                if self.output_keys:
+                    self.output.write_keys(self.get_keys())
                 self.execution_time = time.time()-t0
                 status = 'finished'
-        except KeyboardInterrupt:
-            self.output.write(self.get_fds())
-            logging.info("\n\nExiting by command")
-            status = 'exited'
-        
+        except (KeyboardInterrupt, Cancelled) as e:
+            if self.fds is not None:
+                self.output.write(self.get_fds(), self.natts, self.metadata())
+                if self.output_keys:
+                    self.output.write_keys(self.get_keys())
+            if isinstance(e, Cancelled):
+                logging.info("Cancelled")
+                status = 'cancelled'
+            else:
+                logging.info("\n\nExiting by command")
+                status = 'exited'
+        if status not in ('finished', 'cached'):
+            self.execution_time = time.time()-t0
+        if self.cache is not None and status != 'cached':
+            self.store(status == 'finished')
+        self.log_results(status)
+
+    def log_results(self, status):
+        '''
+        Appends the results of the run to the stats file
+        '''
         self.stats.log_results([
             self.output.dbname,
             self.output.fout_path,
             self.output.st,
             str(self.nrecs),
             str(self.natts),
-            str(self.fds.n_fds),
+            str(self.counts()[0]),
             str(self.reading_time),
             str(self.execution_time),
             str(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss),
             status,
             str(self.row_checks),
-            ])
+            ] + (list(map(str, self.memory.report())) if self.memory is not None else ['']*(len(STRUCTURES)+1)))
             
 
 
 
+    def metadata(self):
+        '''
+        Dataset metadata written in the header of binary FD files
+        '''
+        return {
+            'dataset': self.output.dbname,
+            'timestamp': self.output.st,
+            'nrecs': self.nrecs,
+            'columns': self.column_names,
+            'complete': self.rhs is None and self.max_lhs is None,
+        }
+
+    def iterate(self):
+        '''
+        One round of sampling, induction and validation,
+        adding the time of each phase to phase_times
+        '''
+        for _ in self.iterate_levels():
+            pass
+
+    def iterate_levels(self):
+        '''
+        Same as iterate, yielding the number of the next level to validate
+        each time validation finishes a level (see validate_levels)
+        '''
+        self.progress.check()
+        for name, phase in (('sampling', self.sampling), ('induction', self.induction)):
+            t0 = time.time()
+            phase()
+            self.phase_times[name] += time.time()-t0
+            self.account(name)
+        t0 = time.time()
+        for level in self.validate_levels():
+            # THE TIME SPENT BY THE CONSUMER IS NOT VALIDATION TIME
+            self.phase_times['validation'] += time.time()-t0
+            yield level
+            t0 = time.time()
+        self.phase_times['validation'] += time.time()-t0
+        self.account('validation')
+
+    def stream(self):
+        '''
+        Runs HyFD yielding each FD (lhs, rhs), lhs a sorted list of original
+        column ids, as soon as it is certain: when validation finishes the
+        level of its LHS, or at once when the FDs are restored from the cache.
+        The miner must be built with discover=False, the cache and the
+        outputs are written when the run ends.
+        '''
+        t0 = time.time()
+        status = ''
+
+        if self.plis is None:
+            self.preproc()
+            self.account('preproc')
+        entry = self.cache.load(self.fingerprint) if self.cache is not None else None
+        restored = entry is not None and self.restore(entry)
+        if restored:
+            self.go_on = False
+        confirmed = 0
+        try:
+            while self.go_on:
+                for level in self.iterate_levels():
+                    for depth in range(confirmed, level):
+                        for node in self.fds.get_level(depth):
+                            lhs = sorted(self.att_order_map[i] for i in node.get_lhs())
+                            for rhs in sorted(self.att_order_map[i] for i in node.get_rhss()):
+                                yield lhs, rhs
+                    confirmed = max(confirmed, level)
+            # THE FDs NOT YIELDED YET ARE THOSE OF LEVELS VALIDATION NEVER REACHED
+            for lhs, rhss in self.get_fds():
+                if len(lhs) >= confirmed:
+                    for rhs in sorted(rhss):
+                        yield sorted(lhs), rhs
+            status = 'cached' if restored else 'finished'
+        except (KeyboardInterrupt, Cancelled) as e:
+            if isinstance(e, Cancelled):
+                logging.info("Cancelled")
+                status = 'cancelled'
+            else:
+                logging.info("\n\nExiting by command")
+                status = 'exited'
+        except GeneratorExit:
+            # THE CALLER STOPPED READING THE FDs
+            status = 'closed'
+            raise
+        finally:
+            self.execution_time = time.time()-t0
+            if self.fds is not None:
+                self.output.write(self.get_fds(), self.natts, self.metadata())
+                if self.output_keys:
+                    self.output.write_keys(self.get_keys())
+            if self.cache is not None and status != 'cached':
+                self.store(status == 'finished')
+            self.log_results(status)
+
+    def restore(self, entry):
+        '''
+        Seeds the negative cover with the agree-sets of a cache entry,
+        and the FDTree with its FDs if a previous run finished
+        returns True if the FDs were restored
+        '''
+        position = dict((att, x) for x, att in enumerate(self.att_order_map))
+        if self.non_fds is None:
+            self.non_fds = BooleanTree()
+        for mask in entry['non_fds']:
+            self.non_fds.append([bool(mask >> att & 1) for att in self.att_order_map])
+        if entry['fds'] is None:
+            return False
+        self.fds = FDTree(n_atts=self.natts, max_lhs=self.max_lhs)
+        for lhs, rhss in entry['fds']:
+            self.fds.add([position[att] for att in lhs], [position[att] for att in rhss])
+        for key in entry['keys']:
+            self.fds.add_key([position[att] for att in key])
+        return True
+
+    def insert(self, entry, agree_sets):
+        '''
+        FDs of the table after inserting rows into the table of a cache entry:
+        the FDs of the entry specialized with the agree-sets (bitmasks over the
+        original ids) of the pairs involving the inserted rows. Every pair that
+        can violate an FD of the entry is among them, so nothing is validated.
+        The keys of the entry no inserted pair agrees on are still minimal keys.
+        '''
+        key_masks = [sum(1 << att for att in key) for key in entry['keys']]
+        keys = [key for key, key_mask in zip(entry['keys'], key_masks) if not any(mask & key_mask == key_mask for mask in agree_sets)]
+        self.restore({'non_fds': entry['non_fds'], 'fds': entry['fds'], 'keys': keys})
+        # THE FDs OF THE ENTRY ALREADY AGREE WITH ITS AGREE-SETS
+        for _ in self.non_fds:
+            pass
+        for mask in agree_sets:
+            self.non_fds.append([bool(mask >> att & 1) for att in self.att_order_map])
+        self.induction()
+        self.go_on = False
+        return self.fds
+
+    def update(self, entry, inserted, deleted=None):
+        '''
+        Prepares the discovery of a new version of the table of a cache entry,
+        given the agree-sets of the pairs involving inserted rows and, if rows
+        were deleted, of the pairs involving deleted rows in the old version.
+        Without deletions the FDs are found by insert. Otherwise the old FDs
+        specialized with the inserted agree-sets still hold and are not validated,
+        and the run starts from the old agree-sets not produced by deleted pairs.
+        Sampling is skipped, validation runs through all levels.
+        '''
+        self.insert(entry, inserted)
+        if deleted is None:
+            return
+        self.known_fds = self.fds
+        self.fds = None
+        self.non_fds = BooleanTree()
+        for mask in (set(entry['non_fds']) - deleted) | inserted:
+            self.non_fds.append([bool(mask >> att & 1) for att in self.att_order_map])
+        self.efficiency_queue = []
+        self.go_on = True
+
+    def store(self, finished):
+        '''
+        Writes the agree-sets found to the cache, and the FDs and keys if the run finished
+        '''
+        non_fds = []
+        if self.non_fds is not None:
+            non_fds = [sum(1 << self.att_order_map[x] for x, v in enumerate(non_fd) if v) for non_fd in self.non_fds.read()]
+        fds, keys = None, None
+        if finished:
+            fds = [[sorted(lhs), sorted(rhss)] for lhs, rhss in self.get_fds()]
+            keys = list(self.get_keys())
+        self.cache.save(self.fingerprint, non_fds, fds, keys)
+
+    def account(self, phase):
+        '''
+        Samples the size of the data structures at the end of a phase
+        '''
+        if self.memory is not None:
+            self.memory.sample(self, phase)
+
+    def counts(self):
+        '''
+        Number of FDs and non-FDs found so far
+        returns (int, int)
+        '''
+        n_fds = self.fds.n_fds if self.fds is not None else 0
+        n_non_fds = self.non_fds.n_elements if self.non_fds is not None else 0
+        return n_fds, n_non_fds
+
     def print_records(self):
         '''
         Prints a formated version of the records in the database
@@ -168,24 +521,18 @@ class HyFd(object):
         PREPROC as described in algorithm 1 in [1]
         """
         
-        self.nrecs = len(self.records)
-        self.natts = len(self.records[0])
+        self.natts = len(self.records)
+        self.nrecs = len(self.records[0]) if self.natts else 0
         logging.info("PREPROCESSING with {} tuples and {} attributes".format(self.nrecs, self.natts))
         PLI._nrecs = self.nrecs
 
-        # INVERT TABLE RECORDS
-        self.plis = [PLI(pi, build_pli(i)) for pi, i in enumerate(transpose(self.records, self.natts))]
+        # RECORDS ARE LOADED BY COLUMN
+        self.plis = build_plis(self.records, self.nrecs, self.jobs)
         
         self.plis.sort(key=lambda x: x.number_of_parts, reverse=True)
+        self.att_order_map = [pli.att for pli in self.plis]
         
-        self.pli_records = []
-        for pli in self.plis:
-            col = [-1] * self.nrecs
-            for cluster_id, cluster in enumerate(pli):
-                for row in cluster:
-                    col[row] = cluster_id
-            self.pli_records.append(col)
-        self.pli_records = transpose(self.pli_records, self.nrecs)
+        self.pli_records = transpose([pli.probe_table(self.nrecs) for pli in self.plis], self.nrecs)
  
 
 
@@ -195,27 +542,50 @@ class HyFd(object):
         '''
         if self.efficiency_queue is None:
             self.efficiency_queue = []
-            self.non_fds = BooleanTree()
+            if self.non_fds is None:
+                self.non_fds = BooleanTree()
             for x, pli in enumerate(self.plis):
                 ileft = x-1
                 iright = x+1 if x+1 < self.natts else 0
-                for cluster_id in range(len(pli)):
-                    pli[cluster_id].sort( key=lambda k: self.pli_records[k][ileft] if self.pli_records[k][ileft] >= 0 else self.pli_records[k][iright] )
+                pli.sort_clusters( key=lambda k: self.pli_records[k][ileft] if self.pli_records[k][ileft] >= 0 else self.pli_records[k][iright] )
 
             for x in range(self.natts):
                 efficiency = Efficiency(att=x, pli=self.plis[x])
-                self.row_checks += run_window(efficiency, self.plis[x], self.pli_records, self.non_fds)
+                self.row_checks += run_window(efficiency, self.plis[x], self.pli_records, self.non_fds, self.targets)
                 self.efficiency_queue.append(efficiency)
+            if RANDOM in self.strategies:
+                # ONE RUN EACH TO MEASURE THEIR YIELD AGAINST THE WINDOWS
+                for x in range(self.natts):
+                    efficiency = RandomEfficiency(att=x, pli=self.plis[x], seed=x)
+                    if not efficiency.done:
+                        self.row_checks += run_strategy(efficiency, self.plis, self.pli_records, self.non_fds, self.targets)
+                        self.efficiency_queue.append(efficiency)
         else:
             self.efficiency_threshold *= self.learning_factor
             
+            targets = self.targets
             for sug in self.comparison_suggestions:
-                self.non_fds.append(match(self.pli_records[sug[0]], self.pli_records[sug[1]]))
+                agree_set = match(self.pli_records[sug[0]], self.pli_records[sug[1]])
+                if relevant(agree_set, targets):
+                    self.non_fds.append(agree_set)
+            new_suggestions = self.comparison_suggestions[self.focused_suggestions:]
+            if FOCUSED in self.strategies and bool(new_suggestions):
+                # THE TUPLES THAT VIOLATED CANDIDATES LIKELY VIOLATE OTHERS
+                efficiency = FocusedEfficiency([ri for sug in new_suggestions for ri in sug], self.natts, seed=self.focused_suggestions)
+                self.focused_suggestions = len(self.comparison_suggestions)
+                self.row_checks += run_strategy(efficiency, self.plis, self.pli_records, self.non_fds, targets)
+                if not efficiency.done:
+                    self.efficiency_queue.append(efficiency)
 
         
         logging.info("SAMPLING with efficiency_queue of length {}".format(len(self.efficiency_queue)))
         
-        while True:
+        be = 0.0
+        runs = 0
+        self.progress.start('sampling')
+        while bool(self.efficiency_queue):
+            runs += 1
+            self.progress.update(runs)
             
             self.efficiency_queue.sort(key=lambda k: k.eval(), reverse=True)
             
@@ -224,49 +594,88 @@ class HyFd(object):
             logging.debug( "Sampling: Efficiency Queue length:{} | Best Efficiency:{} | Efficiency Threshold:{}".format(len(self.efficiency_queue), round(be, 5), self.efficiency_threshold) )
             
             
-            best_eff.window += 1
-            self.row_checks += run_window(best_eff, self.plis[best_eff.att], self.pli_records, self.non_fds)
+            t0, n_non_fds = time.time(), len(self.non_fds)
+            self.row_checks += run_strategy(best_eff, self.plis, self.pli_records, self.non_fds, self.targets)
+            if self.controller is not None:
+                self.controller.sampled(time.time()-t0, len(self.non_fds)-n_non_fds)
 
             if best_eff.done:
                 del self.efficiency_queue[0]
             if not bool(self.efficiency_queue):
                 logging.debug("Out by no candidates")
-                self.go_on = False
                 break
 
-            if best_eff.eval() < self.efficiency_threshold:
+            # ONCE VALIDATION HAS BEEN MEASURED THE CONTROLLER DECIDES, BEFORE THAT THE THRESHOLD
+            if self.controller is not None and self.controller.validation_cost is not None:
+                if self.controller.stop_sampling():
+                    break
+            elif best_eff.eval() < self.efficiency_threshold:
                 logging.debug("Out by low efficiency")
                 break
         logging.info( "Sampling: Efficiency Queue length:{} | Best Efficiency:{} | Efficiency Threshold:{}".format(len(self.efficiency_queue), round(be, 5), self.efficiency_threshold) )
-        if self.efficiency_threshold <= self.efficiency_limit:
-            self.go_on = False
-        # print ('')
+        if not bool(self.efficiency_queue) or self.efficiency_threshold <= self.efficiency_limit:
+            # NOTHING LEFT TO SAMPLE, THE NEXT VALIDATION RUNS TO THE END
+            self.sampling_exhausted = True
+        self.progress.finish()
     
+    def total_comps(self):
+        '''
+        Number of tuple pairs compared during sampling so far
+        '''
+        if self.efficiency_queue is None:
+            return 0
+        return sum([e.comps for e in self.efficiency_queue])
+
     def induction(self):
         '''
         Induction as defined in algorithm 3 of [1]
         '''
         n = self.non_fds.n_new_elements
-        comps = sum([e.comps for e in self.efficiency_queue]) - self.oldcomps
-        self.oldcomps = comps
-        logging.info("INDUCTION with number of non-FDs:{} | tested pairs:{} | total efficiency:{}".format(n, comps, round(n/comps, 5)) )
-        # print ('\rInduction: Specializing {}/{} new non-FDs'.format(0, n), end='')
-        sys.stdout.flush()
+        total_comps = self.total_comps()
+        comps = total_comps - self.oldcomps
+        self.oldcomps = total_comps
+        logging.info("INDUCTION with number of non-FDs:{} | tested pairs:{} | total efficiency:{}".format(n, comps, round(n/comps, 5) if comps else 0.0) )
+        t0 = time.time()
+        targets = self.targets if self.rhs is not None else list(range(self.natts))
         if self.fds is None:
-            self.fds = FDTree(n_atts=self.natts)
-            self.fds.add([], list(range(self.natts)))
+            self.fds = FDTree(n_atts=self.natts, max_lhs=self.max_lhs)
+            self.fds.add([], targets)
         
-        for lhsi, tuple_match in enumerate(self.non_fds):
-            # logger.info ('Induction: Specializing {}/{} new non-FDs'.format(lhsi+1, n))
-            
-            # sys.stdout.flush()
+        '''
+        New non-FDs are processed as a batch in descending order of LHS size,
+        so that the FDs created by a large non-FD are not specialized again
+        by the smaller ones. lhs=>rhs is skipped when a larger non-FD
+        of the batch (as a bitmask) already states it.
+        '''
+        # ONLY THE TARGET RHSS ARE EVER IN THE TREE
+        full = sum(1 << x for x in targets)
+        new_non_fds = sorted(self.non_fds, key=lambda k: sum(k), reverse=True)
+        masks = []
+        skipped = 0
+        self.progress.start('induction', total=len(new_non_fds))
+        for lhsi, tuple_match in enumerate(new_non_fds):
+            self.progress.update(lhsi)
+            mask = sum(1 << j for j, v in enumerate(tuple_match) if v)
+            free = full & ~mask
+            for larger in masks:
+                if larger & mask == mask:
+                    free &= larger
+                    if not free:
+                        break
+            masks.append(mask)
+            if not free:
+                skipped += 1
+                continue
             lhs = [j for j, v in enumerate(tuple_match) if v]
-            rhss = [j for j, v in enumerate(tuple_match) if not v]
+            rhss = [j for j in range(self.natts) if free >> j & 1]
             
             self.fds.specialize(lhs, rhss)
+        logging.debug("Induction: {} non-FDs subsumed by larger ones".format(skipped))
+        self.progress.finish()
+        if self.controller is not None:
+            self.controller.inducted(time.time()-t0, len(new_non_fds))
 
         self.non_fd_pointer = len(self.non_fds)
-        # print ('')
         return self.fds
 
     def specialize(self, fds, lhs, rhs):
@@ -292,7 +701,7 @@ class HyFd(object):
                     continue
                 yield self.fds.add(new_lhs, [rhs])
 
-    def refines(self, lhs, rhss):
+    def refines(self, lhs, rhss, clusters=None, witnesses=None, keys=True):
         '''
         REFINES THE FD BY CHECKING IF THE LHS => RHS FOR EACH RHS IN RHSS
         The implementation of this function is not described in [1], but a 
@@ -300,13 +709,18 @@ class HyFd(object):
 
         This is an interpretation of its description.
 
+        clusters -- partition to scan instead of the PLI of the first LHS attribute,
+        such as the partition of the whole LHS
+        witnesses -- dict where the pair of rows violating lhs => rhs is stored for each invalid rhs
+        keys -- register lhs in the FDTree if it is a key, queries leave the FDTree untouched
+
         @returns ALL RHS IN RHSS SUCH THAT LHS => RHS IS VALID, IF NONE ARE VALID THEN RETURNS []
         '''
 
         if not bool(rhss):
             return []
-        if not bool(lhs):
-            return [i for i in rhss if len(self.plis[i]) == 1 and len(self.plis[i][0]) == self.nrecs]
+        if not bool(lhs) and clusters is None:
+            return [i for i in rhss if len(self.plis[i]) == 1 and self.plis[i].size == self.nrecs]
         '''
         mask maintains the indices of RHSS that are still valid
         the function returns when mask is empty.
@@ -315,13 +729,16 @@ class HyFd(object):
 
         s_lhs = sorted(lhs)
         
-        clusters = self.plis[s_lhs[0]]
+        if clusters is None:
+            clusters = self.plis[s_lhs[0]]
 
         signatures = (( (i, [self.pli_records[i][x] for x in s_lhs+rhss]) for i in cluster) for cluster in clusters)
         
-        mapping = {}
+        unique = True
         for cluster_encoding in signatures:
-            cluster_encoding = list(cluster_encoding)
+            # ROWS OF DIFFERENT CLUSTERS NEVER SHARE S1, THE MAPPING ONLY
+            # NEEDS TO HOLD THE ROWS OF THE CURRENT CLUSTER
+            mapping = {}
             for ti, row_map in cluster_encoding:
                 '''
                 row_map has the signature created for the LHS and the RHSS for each attribute
@@ -349,6 +766,7 @@ class HyFd(object):
                         's':s2
                     }
                 else: # THERE IS A MAPPING FOR SIGNATURE S1
+                    unique = False
                     s3 = mapping[s1]['s'] # GET IT
                     # AND CHECK IT AGAINST S2
                     diff = [i for i in mask if s2[i] == -1 or s2[i] != s3[i]]
@@ -365,6 +783,8 @@ class HyFd(object):
                             self.comparison_suggestions.append((tj, ti))
                         for i in diff:
                             mask.remove(i)
+                            if witnesses is not None:
+                                witnesses[rhss[i]] = (mapping[s1]['ti'][0], ti)
                     else:
                         mapping[s1]['ti'].append(ti)
 
@@ -375,13 +795,88 @@ class HyFd(object):
                     break
 
         result = [rhss[i] for i in mask]
+        '''
+        No two rows share the values of the LHS, i.e. the stripped partition
+        of the LHS is empty and the LHS is a key
+        '''
+        if keys and unique and self.fds is not None and self.fds.add_key(lhs):
+            logger.debug("KEY FOUND: {}".format(sorted(lhs)))
 
         return result
     
+    def verify(self, fds):
+        '''
+        Checks the FDs in fds, pairs (lhs, rhss) with the original attribute ids
+        as written by Output. FDs with the same LHS are checked together over
+        the partition of the longest prefix they share with other LHSs (see hyfd_libs/verify.py).
+        returns a list of (lhs, rhs, witness) for each lhs -> rhs in fds, witness
+        is None if it holds and a pair of rows violating it otherwise
+        '''
+        position = dict((att, x) for x, att in enumerate(self.att_order_map))
+        unknown = set(att for lhs, rhss in fds for att in list(lhs) + list(rhss)) - set(position)
+        if bool(unknown):
+            raise ValueError('Unknown attributes {}, the database has {} attributes'.format(sorted(unknown), self.natts))
+        groups = {}
+        for lhs, rhss in fds:
+            groups.setdefault(tuple(sorted(set(position[att] for att in lhs))), set()).update(position[att] for att in rhss)
+
+        # SORTED LHSS CHECK THE FDs SHARING A PREFIX ONE AFTER THE OTHER
+        lhss = sorted(groups)
+        partitions = PartitionCache(self.plis, self.nrecs, lhss)
+        n_suggestions = len(self.comparison_suggestions)
+        witnesses = {}
+        for lhs in lhss:
+            rhss = sorted(rhs for rhs in groups[lhs] if rhs not in lhs)
+            clusters = partitions.get(lhs) if bool(lhs) else [range(self.nrecs)]
+            lhs_witnesses = {}
+            if bool(self.refines(list(lhs), rhss, clusters, lhs_witnesses, keys=False)):
+                partitions.held(lhs)
+            for rhs, witness in lhs_witnesses.items():
+                witnesses[(lhs, rhs)] = witness
+        # THE PAIRS ARE ONLY SUGGESTED TO SAMPLING IN DISCOVERY
+        del self.comparison_suggestions[n_suggestions:]
+        logging.info("Verified {} FDs over {} LHSs | {} prefix partitions reused".format(sum(len(rhss) for _, rhss in fds), len(groups), partitions.hits))
+
+        results = []
+        for lhs, rhss in fds:
+            key = tuple(sorted(set(position[att] for att in lhs)))
+            for rhs in rhss:
+                results.append((sorted(lhs), rhs, witnesses.get((key, position[rhs]), None)))
+        return results
+
+    def refine_level(self, level):
+        '''
+        Checks the FDs in all nodes of a level of the FDTree
+        yields (lhs, rhss, valid_rhss) for each node with candidate rhss
+        '''
+        for ni, node in enumerate(level):
+            self.progress.update(ni)
+            lhs = node.get_lhs()
+            rhss = node.get_rhss()
+            if not bool(rhss):
+                continue
+            if self.fds.has_key(lhs):
+                yield lhs, rhss, rhss
+                continue
+            if self.known_fds is not None:
+                known = [rhs for rhs in rhss if self.known_fds.fd_has_generals(lhs, rhs)]
+                yield lhs, rhss, known + self.refines(lhs, [rhs for rhs in rhss if rhs not in known])
+                continue
+            yield lhs, rhss, self.refines(lhs, rhss)
+
     def validation(self):
         '''
         VALIDATION as described in algorithm 4 of [1]
         '''
+        for _ in self.validate_levels():
+            pass
+
+    def validate_levels(self):
+        '''
+        Validation, yielding the number of the next level of the FDTree
+        each time a level is done: the FDs of the levels below it hold
+        and are minimal, later phases only add FDs with larger LHSs
+        '''
         # logging.info("VALIDATION")
         
         
@@ -390,86 +885,183 @@ class HyFd(object):
         if self.current_level is None:
             self.current_level_number = 0
         
-        self.current_level = list(self.fds.get_level(self.current_level_number))
+        self.current_level = self.fds.get_level(self.current_level_number)
         
         comparison_suggestions = []
 
         logging.info ('Validation: Checking {} Nodes in the FDTree | level {}:{}'.format( len(self.current_level), self.current_level_number, self.natts) )
         # sys.stdout.flush()
-        while bool(self.current_level):
+        # LEVELS WITHOUT ACTIVE NODES MAY STILL HAVE ACTIVE NODES BELOW
+        # THE TREE HAS NO NODES BELOW max_lhs, VALIDATION ENDS THERE
+        while self.current_level_number <= self.fds.depth:
             
             # print ("\tCURRENT_LEVEL_NUMBER: ", self.current_level_number)
             # print ("\tCURRENT_LEVEL: ", self.current_level)
             # VALIDATE ALL FDS ON CURRENT LEVEL
             invalid_fds = []
             num_valid_fds = 0
-            for ni, node in enumerate(self.current_level):
-                # print ('\rValidation: Checking {}/{} Nodes in the FDTree'.format(ni+1, len(self.current_level)), end='')
-                sys.stdout.flush()
-                lhs = node.get_lhs()
-                rhss = node.get_rhss()
-                if not bool(rhss):
-                    continue
-                
-                valid_rhss = self.refines(lhs, rhss)
-
+            t0 = time.time()
+            self.progress.start('validation', total=len(self.current_level), level=self.current_level_number)
+            for lhs, rhss, valid_rhss in self.refine_level(self.current_level):
                 num_valid_fds += len(valid_rhss)
 
                 invalid_fds.append( (lhs, [i for i in rhss if i not in valid_rhss]) )
                 # print (list(self.fds.read_fds()))
 
-            # ADD ALL CHILDREN TO THE NEXT LEVEL
-            next_level = []
-
-            for node in self.current_level:
-                for child in node.get_children():
-                    next_level.append(child)
-
+            self.progress.finish()
             # SPECIALIZE ALL INVALID FDs
             # print ("\tSPECIALIZING INVALIDS: ", invalid_fds, "||", list(self.fds.read_fds()))
             for invalid_fd in invalid_fds:
                 lhs, rhss = invalid_fd
-                # for node in self.specialize(self.fds, lhs, rhs):
-                for node in self.fds.specialize(lhs, rhss):
-                    if node is not None:
-                        next_level.append(node)
-                
+                self.fds.specialize(lhs, rhss)
 
-            self.current_level = next_level
+            # THE NEXT LEVEL HOLDS THE CHILDREN AND THE SPECIALIZED FDs
             self.current_level_number += 1
+            self.current_level = self.fds.get_level(self.current_level_number)
+            elapsed = time.time()-t0
+            yield self.current_level_number
             # JUDGE EFFICIENCY OF VALIDATION PROCESS
-            if len(invalid_fds) > self.invalid_fds_threshold * num_valid_fds:
-                return self.fds, comparison_suggestions # ACTUAL
+            if self.sampling_exhausted:
+                continue
+            if self.controller is not None:
+                if self.controller.validated(elapsed, sum(len(rhss) for _, rhss in invalid_fds)):
+                    return
+            elif len(invalid_fds) > self.invalid_fds_threshold * num_valid_fds:
+                return
 
         self.go_on = False
-        return self.fds, set([]) # ACTUAL 
         
 
         
 
-def run_window(efficiency, pli, pli_records, non_fds):
-    # logger.debug("\tRUN:{} window::{}".format(pli,efficiency.window ))
-    # print ("\tRUN:", pli, 'window::',efficiency.window )
-    n_rows = 0
-    prev_num_non_fds = len(non_fds)
-    for cluster in pli:
-        # print ('\t\t:: CLUSTER:',cluster, '|', range(len(cluster)-efficiency.window+1))
-        for i in range(len(cluster)-efficiency.window+1):
-            # logger.debug('\t\t Comparing tuples {} - {}'.format(cluster[i],cluster[i+efficiency.window-1]))
-            # # print ('\t\t\t->',)
-            n_rows += 1 # Add row reading
-            pivot = pli_records[cluster[i]]
-            partner = pli_records[cluster[i+efficiency.window-1]]
-            compare = match(pivot, partner)
-            # logger.debug('\t\t\tResult:{} || New?:{}'.format( compare, compare not in non_fds))
-            if not all(compare):
-                non_fds.append(compare)
-            efficiency.increase_comps()
-    efficiency.results += len(non_fds) - prev_num_non_fds
-    return n_rows
-
-def match(row1, row2):
-    return tuple([i==j and i>-1 for i, j in zip(row1, row2)])
+
+class DistributedHyFd(HyFd):
+    '''
+    HyFd where sampling and validation are carried out by workers
+    holding hash-shards of the rows (see hyfd_libs/distributed.py).
+    The coordinator only keeps the global dictionaries, the negative
+    cover and the FDTree.
+    '''
+    def load(self, args):
+        '''
+        Builds the global dictionaries, rows are streamed to the workers in preproc
+        '''
+        self.coordinator = Coordinator(args.workers.split(','))
+        self.encoder = GlobalEncoder(args.db_path, separator=args.separator, ignore_headers=args.ignore_headers, table=getattr(args, 'table', None)).fit()
+        self.comps = 0
+        return None
+
+    def execute(self):
+        try:
+            super(DistributedHyFd, self).execute()
+        finally:
+            self.coordinator.close()
+
+    def stream(self):
+        try:
+            for fd in super(DistributedHyFd, self).stream():
+                yield fd
+        finally:
+            self.coordinator.close()
+
+    def preproc(self):
+        self.nrecs = self.encoder.nrecs
+        self.natts = self.encoder.natts
+        self.att_order_map = self.encoder.att_order_map
+        logging.info("PREPROCESSING with {} tuples and {} attributes on {} workers".format(self.nrecs, self.natts, len(self.coordinator)))
+        shards = self.coordinator.distribute(self.encoder)
+        logging.info("Rows per worker: {}".format([s['nrecs'] for s in shards]))
+
+    def total_comps(self):
+        return self.comps
+
+    def is_unique(self, lhs):
+        results, keys, non_fds, row_checks = self.coordinator.validate([[sorted(lhs), []]])
+        self.row_checks += row_checks
+        return keys[0]
+
+    def sampling(self):
+        '''
+        Each worker samples its shard until the efficiency threshold is reached
+        '''
+        if self.non_fds is None:
+            self.non_fds = BooleanTree()
+        else:
+            self.efficiency_threshold *= self.learning_factor
+
+        logging.info("SAMPLING on {} workers | Efficiency Threshold:{}".format(len(self.coordinator), self.efficiency_threshold))
+        answers = self.coordinator.sample(self.efficiency_threshold)
+        targets = self.targets
+        for answer in answers:
+            for non_fd in answer['non_fds']:
+                if relevant(non_fd, targets):
+                    self.non_fds.append(non_fd)
+            self.row_checks += answer['row_checks']
+            self.comps += answer['row_checks']
+        if all(answer['done'] for answer in answers):
+            logging.debug("Out by no candidates")
+            self.sampling_exhausted = True
+        if self.efficiency_threshold <= self.efficiency_limit:
+            self.sampling_exhausted = True
+
+    def refine_level(self, level):
+        '''
+        Sends the whole level to the workers, violations found are
+        added to the negative cover for the next induction
+        '''
+        candidates = [(node.get_lhs(), node.get_rhss()) for node in level]
+        candidates = [(lhs, rhss) for lhs, rhss in candidates if bool(rhss)]
+        checked = [(lhs, rhss) for lhs, rhss in candidates if not self.fds.has_key(lhs)]
+        valid = {}
+        if bool(checked):
+            results, keys, non_fds, row_checks = self.coordinator.validate([[sorted(lhs), rhss] for lhs, rhss in checked])
+            self.row_checks += row_checks
+            targets = self.targets
+            for non_fd in non_fds:
+                if relevant(non_fd, targets):
+                    self.non_fds.append(non_fd)
+            for (lhs, rhss), valid_rhss, unique in zip(checked, results, keys):
+                valid[tuple(sorted(lhs))] = valid_rhss
+                if unique and self.fds.add_key(lhs):
+                    logger.debug("KEY FOUND: {}".format(sorted(lhs)))
+        # LHSS CONTAINING A KEY ARE NOT SENT, ALL THEIR RHSS HOLD
+        return [(lhs, rhss, valid.get(tuple(sorted(lhs)), rhss)) for lhs, rhss in candidates]
+
+
+class OutOfCoreHyFd(HyFd):
+    '''
+    HyFd over disk-backed PLIs and pli_records (see hyfd_libs/disk.py).
+    The records are streamed from the file and never kept in memory.
+    '''
+    def load(self, args):
+        '''
+        Streams the database into disk-backed arrays
+        '''
+        rows = open_backend(args.db_path, args.separator, args.ignore_headers, getattr(args, 'table', None)).rows()
+        self.store = DiskStore(directory=args.out_of_core, buffer_rows=args.buffer_rows).build(rows)
+        return None
+
+    def execute(self):
+        try:
+            super(OutOfCoreHyFd, self).execute()
+        finally:
+            self.store.close()
+
+    def stream(self):
+        try:
+            for fd in super(OutOfCoreHyFd, self).stream():
+                yield fd
+        finally:
+            self.store.close()
+
+    def preproc(self):
+        self.nrecs = self.store.nrecs
+        self.natts = self.store.natts
+        logging.info("PREPROCESSING with {} tuples and {} attributes out of core in {}".format(self.nrecs, self.natts, self.store.directory))
+        PLI._nrecs = self.nrecs
+        self.plis = self.store.plis
+        self.pli_records = self.store.pli_records
+        self.att_order_map = self.store.att_order_map
 
 
 if __name__ == "__main__":
@@ -481,6 +1073,21 @@ if __name__ == "__main__":
     __parser__.add_argument('-i', '--ignore_headers', help='Ignore Headers', action='store_true')
     __parser__.add_argument('-l', '--logfile', help='Output to hyfd.log', action='store_true')
     __parser__.add_argument('-r', '--restart', help='Restart file hyfd_results.txt', action='store_true')
+    __parser__.add_argument('-a', '--adaptive', help='Switch between sampling and validation by their measured cost per agree-set and per invalid FD instead of -efft/-ift', action='store_true')
+    __parser__.add_argument('-R', '--rhs', metavar='col,col,...', type=column_ids, help='Only discover the FDs with these columns (ids from 0) in the right hand side', default=None)
+    __parser__.add_argument('-x', '--max-lhs', metavar='k', type=int, help='Only discover the FDs with at most k attributes in the left hand side', default=None)
+    __parser__.add_argument('-C', '--cache', metavar='directory', type=str, help='Reuse the agree-sets and FDs of previous runs on the same data, cached in directory', default=None)
+    __parser__.add_argument('-j', '--jobs', metavar='processes', type=int, help='Processes used to build the PLIs', default=1)
+    __parser__.add_argument('-t', '--table', metavar='table', type=str, help='Table to read from an SQLite database', default=None)
+    __parser__.add_argument('-k', '--keys', help='Also output the minimal keys, only those found during validation with -R or -x', action='store_true')
+    __parser__.add_argument('-B', '--binary', help='Also output the FDs in the binary format of hyfd_libs/fdfile.py', action='store_true')
+    __parser__.add_argument('-o', '--out-of-core', metavar='directory', type=str, help='Keep PLIs and records in disk-backed arrays under directory', default=None)
+    __parser__.add_argument('-b', '--buffer-rows', metavar='rows', type=int, help='Rows buffered per column in out-of-core mode', default=BUFFER_ROWS)
+    __parser__.add_argument('-M', '--memory', metavar='mode', choices=['sizes', 'tracemalloc'], help='Account the memory of each data structure at phase boundaries (sizes or tracemalloc)', default=None)
+    __parser__.add_argument('-p', '--progress', help='Log progress events', action='store_true')
+    __parser__.add_argument('-g', '--sampling', metavar='strategy,...', type=strategies, help='Sampling strategies competing by yield with the sorted-neighbourhood windows: random (pairs in large clusters), focused (around comparison suggestions)', default=[WINDOW])
+    __parser__.add_argument('-S', '--stream', help='Print each FD as [lhs, rhs] to stdout as soon as it is certain', action='store_true')
+    __parser__.add_argument('-w', '--workers', metavar='host:port,...', type=str, help='Run distributed on the given workers (see hyfd_worker.py)', default=None)
     __parser__.add_argument(
         '-efft',
         metavar='efficiency threshold',
@@ -517,5 +1124,16 @@ if __name__ == "__main__":
         logging.basicConfig( level=level, format=FORMAT )
 
     logging.debug( "Working with file: {}".format(args.db_path) )
+    args.progress = log_progress if args.progress else None
+    args.discover = not args.stream
 
-    HyFd(args)
+    if args.workers:
+        miner = DistributedHyFd(args)
+    elif args.out_of_core:
+        miner = OutOfCoreHyFd(args)
+    else:
+        miner = HyFd(args)
+    if args.stream:
+        for lhs, rhs in miner.stream():
+            print(json.dumps([lhs, rhs]))
+            sys.stdout.flush()
@@ -0,0 +1,74 @@
+#!/bin/bash
+# BENCHMARKS ON SYNTHETIC TABLES OF hyfd_generate.py WITH FIXED SEEDS
+# RUN FROM THE ROOT OF THE REPOSITORY, TABLES ARE WRITTEN IN bench/ AND THE
+# EXECUTION TIME AND ROW CHECKS OF EACH hyfd.py RUN GO TO results/hyfd_results.txt
+set -e
+mkdir -p bench
+
+# TABLES
+python hyfd_generate.py -m -r 1000 -c 16 -k 4 -e 1 bench/t16.csv
+python hyfd_generate.py -m -r 1500 -c 13 -k 5 -e 1 bench/t13.csv
+python hyfd_generate.py -m -r 100000 -c 16 -k 4 -e 2 bench/t16_100k.csv
+# THE SAME SEED GIVES THE ROWS OF t13 FOLLOWED BY 100 INSERTED ROWS
+python hyfd_generate.py -m -r 1600 -c 13 -k 5 -e 1 bench/t13_ins.csv
+tail -n +101 bench/t13.csv > bench/t13_del.csv
+python hyfd_generate.py -m -r 200000 -c 8 -k 100000 -e 4 bench/hc.csv
+python hyfd_generate.py -m -r 30000 -c 14 -k 20,20,30,30,50,50,100,100,500,500,1000,1000,5000,5000 -z 1.6 -F 4 -L 2 -e 3 bench/skew.csv
+
+# GENERALIZATION INDEX: TIME IN has_generals AND blocked
+python -m cProfile -s tottime hyfd.py -m bench/t16.csv | grep -E "function calls|has_generals|blocked"
+
+# RESULT CACHE: A FULL RUN, THEN A RERUN WITH OTHER PARAMETERS ANSWERED FROM THE CACHE
+rm -rf bench/cache
+python hyfd.py -m -C bench/cache bench/t13.csv
+python hyfd.py -m -C bench/cache -efft 0.05 bench/t13.csv
+
+# ADAPTIVE SWITCHING: THRESHOLDS AGAINST MEASURED COSTS
+python hyfd.py -m bench/t13.csv
+python hyfd.py -m -a bench/t13.csv
+python hyfd.py -m bench/t16.csv
+python hyfd.py -m -a bench/t16.csv
+
+# TARGETED DISCOVERY: ONE RIGHT HAND SIDE AGAINST ALL OF THEM (RUNS ABOVE)
+python hyfd.py -m -R 15 bench/t16.csv
+python hyfd.py -m -R 0 bench/t16.csv
+
+# CAPPED LEFT HAND SIDES, THE MINIMAL FDs OF t16 HAVE 8 TO 10 LHS ATTRIBUTES
+python hyfd.py -m -x 4 bench/t16.csv
+python hyfd.py -m -x 8 bench/t16.csv
+python hyfd.py -m -x 9 bench/t16.csv
+
+# VERIFICATION: THE FDs OF t13 ON t13, ALL HOLD, AND THE FDs OF THE LAST RUN ON t16
+# (-x 9 ABOVE) ON A LARGER TABLE WITH ANOTHER SEED, WHERE NONE HOLD
+python hyfd_verify.py -m bench/t13.csv $(ls -t json/t13-*[0-9].json | head -1)
+python hyfd_verify.py -m bench/t16_100k.csv $(ls -t json/t16-*[0-9].json | head -1)
+
+# DIFFERENTIAL DISCOVERY FROM THE CACHED RESULTS OF t13, AGAINST FULL RUNS OF THE NEW VERSIONS
+rm -rf bench/diff
+python hyfd.py -m -C bench/diff bench/t13.csv
+time python hyfd_diff.py -m -C bench/diff bench/t13.csv bench/t13_ins.csv
+time python hyfd_diff.py -m -C bench/diff bench/t13.csv bench/t13_del.csv
+python hyfd.py -m bench/t13_ins.csv
+python hyfd.py -m bench/t13_del.csv
+
+# BINARY FD FILES: 1M RANDOM FDs OVER 40 COLUMNS, SIZE, OPENING AND A FILTERED SCAN AGAINST json.load
+python -c "import json, random; rng = random.Random(0); json.dump([[sorted(rng.sample(range(40), rng.randint(1, 8))), sorted(rng.sample(range(40), rng.randint(1, 3)))] for _ in range(1000000)], open('bench/fds1m.json', 'w'))"
+python hyfd_fds.py -m -n 40 bench/fds1m.json bench/fds1m.fds
+ls -l bench/fds1m.json bench/fds1m.fds
+python -m timeit -n 1 -r 3 -s "from hyfd_libs.fdfile import FDFile" "FDFile('bench/fds1m.fds').close()"
+python -m timeit -n 1 -r 3 -s "from hyfd_libs.fdfile import FDFile; f = FDFile('bench/fds1m.fds')" "sum(1 for _ in f.select(rhs=3, max_lhs=4))"
+python -m timeit -n 1 -r 3 "import json; json.load(open('bench/fds1m.json'))"
+
+# STREAMING: TIME TO THE FIRST FD AND TO THE END OF THE RUN
+for t in t13 t16; do
+    python hyfd.py -m -S bench/$t.csv | python -c "import sys, time; t0 = time.time(); sys.stdin.readline(); first = time.time() - t0; n = 1 + sum(1 for _ in sys.stdin); print('first FD after {:.1f}s, {} FDs in {:.1f}s'.format(first, n, time.time() - t0))"
+done
+
+# SAMPLING STRATEGIES ON SKEWED VALUES: WINDOWS ONLY AGAINST WINDOWS, RANDOM AND FOCUSED PAIRS
+python hyfd.py -m bench/skew.csv
+python hyfd.py -m -g random,focused bench/skew.csv
+
+# OUT-OF-CORE STORE: BUILD TIME AND PEAK MEMORY ON FEW AND ON MANY DISTINCT VALUES
+for t in t16_100k hc; do
+    python -c "import time, resource; from hyfd_libs.disk import DiskStore; from hyfd_libs.backends import open_backend; t0 = time.time(); s = DiskStore('bench').build(open_backend('bench/$t.csv').rows()); print('build {:.1f}s, maxrss {}MB'.format(time.time() - t0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024)); s.close()"
+done
@@ -0,0 +1,80 @@
+"""
+Differential discovery between two versions of a table.
+The agree-sets and FDs of the old version are taken from the cache
+(-C, discovered and cached first if missing) and only the pairs of rows
+involving changed rows are examined: inserts specialize the old FDs,
+deletes drop the agree-sets they may have produced from the negative
+cover the new run starts from, and the old FDs that still hold are
+not validated again (see hyfd_libs/diff.py and HyFd.update).
+Writes the FDs added and removed in the new version.
+"""
+import time
+import logging
+import argparse
+from hyfd import HyFd, INVALID_FDS_THRESHOLD, EFFICIENCY_THRESHOLD_INIT, LEARNING_FACTOR, EFFICIENCY_LIMIT
+from hyfd_libs.backends import open_backend
+from hyfd_libs.diff import changed_rows, agree_sets, fd_set
+
+FORMAT = "[%(filename)s:%(lineno)s - %(funcName)20s() ] %(message)s"
+CACHE_DIRECTORY = './cache/'
+
+
+def rows(args, path):
+    return open_backend(path, args.separator, args.ignore_headers, args.table).rows()
+
+
+if __name__ == "__main__":
+    __parser__ = argparse.ArgumentParser(description='HyFD Differential Discovery')
+    __parser__.add_argument('old_path', metavar='old_path', type=str, help='path to the old version of the database')
+    __parser__.add_argument('new_path', metavar='new_path', type=str, help='path to the new version of the database')
+    __parser__.add_argument('-s', '--separator', metavar='separator', type=str, help='Value separator', default=",")
+    __parser__.add_argument('-i', '--ignore_headers', help='Ignore Headers', action='store_true')
+    __parser__.add_argument('-t', '--table', metavar='table', type=str, help='Table to read from an SQLite database', default=None)
+    __parser__.add_argument('-C', '--cache', metavar='directory', type=str, help='Cache holding the results of the old version', default=CACHE_DIRECTORY)
+    __parser__.add_argument('-d', '--debug', help='Debug mode', action='store_true')
+    __parser__.add_argument('-m', '--mute', help='No Output', action='store_true')
+
+    args = __parser__.parse_args()
+    level = logging.DEBUG if args.debug else logging.INFO
+    if args.mute:
+        level = logging.CRITICAL
+    logging.basicConfig( level=level, format=FORMAT )
+
+    def miner(path):
+        return HyFd(argparse.Namespace(
+            db_path=path, separator=args.separator, ignore_headers=args.ignore_headers, table=args.table, cache=args.cache,
+            restart=False, discover=False, efft=EFFICIENCY_THRESHOLD_INIT, lf=LEARNING_FACTOR, ift=INVALID_FDS_THRESHOLD, el=EFFICIENCY_LIMIT))
+
+    t0 = time.time()
+    old = miner(args.old_path)
+    entry = old.cache.load(old.fingerprint)
+    if entry is None or entry['fds'] is None:
+        logging.info("No finished run of {} in the cache, discovering its FDs".format(args.old_path))
+        old.execute()
+        entry = old.cache.load(old.fingerprint)
+    old_fds = fd_set(entry['fds'])
+
+    new = miner(args.new_path)
+    if new.natts != old.natts:
+        logging.warning("The schema changed from {} to {} attributes, discovering the FDs of {} from scratch".format(old.natts, new.natts, args.new_path))
+        new.execute()
+    else:
+        deleted, inserted = changed_rows(rows(args, args.old_path), rows(args, args.new_path))
+        logging.info("Rows deleted:{} | Rows inserted:{}".format(len(deleted), len(inserted)))
+        inserted_sets = agree_sets(new, inserted)
+        # AGREE-SETS OF DELETED PAIRS MAY BE GONE, THE OTHERS STILL HOLD
+        deleted_sets = agree_sets(old, deleted) if bool(deleted) else None
+        if deleted_sets is not None:
+            logging.info("Agree-sets kept:{} | dropped:{} | new:{}".format(len(set(entry['non_fds']) - deleted_sets), len(set(entry['non_fds']) & deleted_sets), len(inserted_sets)))
+        new.update(entry, inserted_sets, deleted_sets)
+        if new.go_on:
+            new.execute()
+        else:
+            new.output.write(new.get_fds())
+            new.store(True)
+    new_fds = fd_set(new.get_fds())
+
+    added, removed = new_fds - old_fds, old_fds - new_fds
+    new.output.write_diff(added, removed)
+    logging.info("Differential discovery in {}s".format(round(time.time()-t0, 3)))
+    print('{} FDs added, {} FDs removed'.format(len(added), len(removed)))
@@ -0,0 +1,45 @@
+"""
+Conversion between the JSON and the binary FD files.
+An out_path ending in .fds converts the JSON in in_path to the binary
+format of hyfd_libs/fdfile.py, otherwise the binary file in in_path is
+converted to JSON, keeping only the FDs selected by -R and -x.
+"""
+import json
+import time
+import logging
+import argparse
+from hyfd_libs.fdfile import FDFile, json_to_binary
+
+FORMAT = "[%(filename)s:%(lineno)s - %(funcName)20s() ] %(message)s"
+
+
+if __name__ == "__main__":
+    __parser__ = argparse.ArgumentParser(description='HyFD FD File Conversion')
+    __parser__.add_argument('in_path', metavar='in_path', type=str, help='path of the FDs to read')
+    __parser__.add_argument('out_path', metavar='out_path', type=str, help='path of the FDs to write, binary if it ends in .fds')
+    __parser__.add_argument('-n', '--n-atts', metavar='n', type=int, help='Number of columns of the dataset, by default the largest column id found plus one', default=None)
+    __parser__.add_argument('-H', '--headers', metavar='name,...', type=str, help='Column names stored in the binary file', default=None)
+    __parser__.add_argument('-R', '--rhs', metavar='col', type=int, help='Only convert the FDs with this column in the right hand side', default=None)
+    __parser__.add_argument('-x', '--max-lhs', metavar='k', type=int, help='Only convert the FDs with at most k attributes in the left hand side', default=None)
+    __parser__.add_argument('-d', '--debug', help='Debug mode', action='store_true')
+    __parser__.add_argument('-m', '--mute', help='No Output', action='store_true')
+
+    args = __parser__.parse_args()
+    level = logging.DEBUG if args.debug else logging.INFO
+    if args.mute:
+        level = logging.CRITICAL
+    logging.basicConfig( level=level, format=FORMAT )
+
+    t0 = time.time()
+    if args.out_path.endswith('.fds'):
+        if args.rhs is not None or args.max_lhs is not None:
+            __parser__.error('-R and -x only apply when converting to JSON')
+        columns = args.headers.split(',') if args.headers is not None else None
+        n_atts = args.n_atts if args.n_atts is not None or columns is None else len(columns)
+        n_records = json_to_binary(args.in_path, args.out_path, n_atts, {'columns': columns})
+    else:
+        with FDFile(args.in_path) as fds, open(args.out_path, 'w') as fout:
+            selected = [[lhs, rhss] for lhs, rhss in fds.select(rhs=args.rhs, max_lhs=args.max_lhs)]
+            json.dump(selected, fout)
+            n_records = len(selected)
+    logging.info("{} records written in {} in {}s".format(n_records, args.out_path, round(time.time()-t0, 3)))
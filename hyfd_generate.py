@@ -0,0 +1,93 @@
+"""
+Generator of synthetic tables with planted FDs.
+Writes the table to out_path (CSV, gzipped if it ends in .gz) one row
+at a time, and the planted FDs to <out_path>.fds.json in the format of
+the output of HyFd. With --check, runs HyFd on the table and reports
+whether the planted FDs were recovered.
+"""
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+from hyfd import HyFd, INVALID_FDS_THRESHOLD, EFFICIENCY_THRESHOLD_INIT, LEARNING_FACTOR, EFFICIENCY_LIMIT
+from hyfd_libs.generator import TableGenerator, write_csv, recovered
+
+FORMAT = "[%(filename)s:%(lineno)s - %(funcName)20s() ] %(message)s"
+
+
+def planted_fd(text):
+    '''
+    FD written as lhs:rhs, e.g. 0,1:2 for [0, 1] -> 2
+    '''
+    lhs, rhs = text.split(':')
+    return [int(att) for att in lhs.split(',') if att != ''], int(rhs)
+
+
+def random_fds(n_fds, n_atts, lhs_size, rng):
+    '''
+    n_fds FDs with lhs_size attributes in the LHS, free of cycles
+    '''
+    order = list(range(n_atts))
+    rng.shuffle(order)
+    fds = []
+    for i in range(n_atts-1, lhs_size-1, -1):
+        if len(fds) == n_fds:
+            break
+        fds.append((sorted(rng.sample(order[:i], lhs_size)), order[i]))
+    if len(fds) < n_fds:
+        raise ValueError('Only {} FDs with {} LHS attributes fit in {} columns'.format(len(fds), lhs_size, n_atts))
+    return fds
+
+
+if __name__ == "__main__":
+    __parser__ = argparse.ArgumentParser(description='HyFD Synthetic Tables')
+    __parser__.add_argument('out_path', metavar='out_path', type=str, help='path of the table to write')
+    __parser__.add_argument('-r', '--rows', metavar='rows', type=int, help='Number of rows', default=1000)
+    __parser__.add_argument('-c', '--columns', metavar='columns', type=int, help='Number of columns', default=10)
+    __parser__.add_argument('-k', '--cardinality', metavar='n,...', type=str, help='Distinct values of each column, one for all or one per column', default='100')
+    __parser__.add_argument('-z', '--skew', metavar='s', type=float, help='Zipf exponent of the values, 0 for uniform', default=0.0)
+    __parser__.add_argument('-u', '--duplicates', metavar='ratio', type=float, help='Ratio of rows copying a previous row', default=0.0)
+    __parser__.add_argument('-n', '--nulls', metavar='ratio', type=float, help='Ratio of empty values, not applied to the RHS of planted FDs', default=0.0)
+    __parser__.add_argument('-f', '--fd', metavar='lhs:rhs', type=planted_fd, action='append', help='Planted FD, e.g. 0,1:2 (repeatable)', default=[])
+    __parser__.add_argument('-F', '--random-fds', metavar='n', type=int, help='Number of random FDs to plant', default=0)
+    __parser__.add_argument('-L', '--lhs-size', metavar='n', type=int, help='LHS size of the random FDs', default=2)
+    __parser__.add_argument('-e', '--seed', metavar='seed', type=int, help='Random seed', default=0)
+    __parser__.add_argument('-s', '--separator', metavar='separator', type=str, help='Value separator', default=",")
+    __parser__.add_argument('--codes', help='Write the integer codes of the values', action='store_true')
+    __parser__.add_argument('--check', help='Run HyFd on the table and check the planted FDs are recovered', action='store_true')
+    __parser__.add_argument('-d', '--debug', help='Debug mode', action='store_true')
+    __parser__.add_argument('-m', '--mute', help='No Output', action='store_true')
+
+    args = __parser__.parse_args()
+    level = logging.DEBUG if args.debug else logging.INFO
+    if args.mute:
+        level = logging.CRITICAL
+    logging.basicConfig( level=level, format=FORMAT )
+
+    cardinalities = [int(c) for c in args.cardinality.split(',')]
+    if len(cardinalities) == 1:
+        cardinalities = cardinalities * args.columns
+    if len(cardinalities) != args.columns:
+        __parser__.error('{} cardinalities given for {} columns'.format(len(cardinalities), args.columns))
+    fds = args.fd + random_fds(args.random_fds, args.columns, args.lhs_size, random.Random(args.seed))
+
+    generator = TableGenerator(cardinalities, fds, skew=args.skew, duplicates=args.duplicates, nulls=args.nulls, seed=args.seed)
+    t0 = time.time()
+    n_rows = write_csv(args.out_path, generator.rows(args.rows), args.separator, args.codes)
+    logging.info("{} rows and {} columns written in {} in {}s".format(n_rows, args.columns, args.out_path, round(time.time()-t0, 3)))
+    planted_path = args.out_path + '.fds.json'
+    with open(planted_path, 'w') as fout:
+        json.dump(generator.planted(), fout)
+    logging.info("Planted FDs written in: {}".format(planted_path))
+
+    if args.check:
+        miner = HyFd(argparse.Namespace(
+            db_path=args.out_path, separator=args.separator, ignore_headers=False, restart=False,
+            efft=EFFICIENCY_THRESHOLD_INIT, lf=LEARNING_FACTOR, ift=INVALID_FDS_THRESHOLD, el=EFFICIENCY_LIMIT))
+        hits, misses = recovered(generator.planted(), list(miner.get_fds()), args.columns)
+        for lhs, rhss in misses:
+            logging.info("Planted FD {} -> {} not recovered".format(lhs, rhss))
+        print('{} of {} planted FDs recovered, {} FDs discovered in {}s'.format(len(hits), len(hits)+len(misses), miner.fds.n_fds, round(miner.execution_time, 3)))
+        sys.exit(1 if bool(misses) else 0)
@@ -0,0 +1,52 @@
+"""
+Asyncio job runner.
+Discovers the FDs of several databases in a pool of processes (see
+hyfd_libs/jobs.py and JobRunner), printing the progress of each job
+and the number of FDs found at each iteration.
+"""
+import asyncio
+import logging
+import argparse
+from hyfd_server import miner, MINER_DEFAULTS
+from hyfd_libs.jobs import JobRunner, FINISHED
+
+FORMAT = "[%(filename)s:%(lineno)s - %(funcName)20s() ] %(message)s"
+
+
+async def follow(runner, job_id):
+    async for event in runner.stream(job_id):
+        if event['type'] == 'progress':
+            logging.info("Job {}: {} level {} {}/{}".format(job_id, event['phase'], event['level'], event['done'], event['total']))
+        elif event['type'] == 'iteration':
+            logging.info("Job {}: iteration {}, {} FDs".format(job_id, event['iteration'], event['n_fds']))
+    status = runner.status(job_id)
+    print('{}\t{}\t{}\t{}'.format(status['db_path'], status['state'], status['n_fds'], status['execution_time']))
+    return status['state'] == FINISHED
+
+
+async def main(args):
+    runner = JobRunner(miner, dict(MINER_DEFAULTS, separator=args.separator, ignore_headers=args.ignore_headers), max_jobs=args.jobs, cache=args.cache)
+    try:
+        job_ids = [runner.submit(db_path) for db_path in args.db_paths]
+        return all(await asyncio.gather(*[follow(runner, job_id) for job_id in job_ids]))
+    finally:
+        await runner.close()
+
+
+if __name__ == "__main__":
+    __parser__ = argparse.ArgumentParser(description='HyFD Job Runner')
+    __parser__.add_argument('db_paths', metavar='db_path', type=str, nargs='+', help='paths to the databases')
+    __parser__.add_argument('-s', '--separator', metavar='separator', type=str, help='Value separator', default=",")
+    __parser__.add_argument('-i', '--ignore_headers', help='Ignore Headers', action='store_true')
+    __parser__.add_argument('-j', '--jobs', metavar='jobs', type=int, help='Jobs running at the same time', default=2)
+    __parser__.add_argument('-C', '--cache', metavar='directory', type=str, help='Cache of results and encoded columns shared by the jobs', default=None)
+    __parser__.add_argument('-d', '--debug', help='Debug mode', action='store_true')
+    __parser__.add_argument('-m', '--mute', help='No Output', action='store_true')
+
+    args = __parser__.parse_args()
+    level = logging.DEBUG if args.debug else logging.INFO
+    if args.mute:
+        level = logging.CRITICAL
+    logging.basicConfig( level=level, format=FORMAT )
+
+    exit(0 if asyncio.run(main(args)) else 1)
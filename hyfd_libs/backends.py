@@ -0,0 +1,208 @@
+'''
+Input backends of HyFd
+
+A backend feeds the database column by column, each column as an array
+with one code per row where equal codes mean equal values, which is
+all the PLIs need. Backends also give the rows, for the consumers that
+read the database row by row (the out-of-core mode).
+
+CSVBackend -- plain or compressed (.gz, .bz2, .xz, .zst) CSV files, streamed
+SQLiteBackend -- a table of an SQLite database, codes are computed by the
+database with DENSE_RANK (GROUP BY on SQLite < 3.25)
+ParquetBackend -- Parquet files, columns are read dictionary-encoded
+and the dictionary indices are used as codes (needs pyarrow)
+'''
+import io
+import gzip
+import bz2
+import lzma
+import sqlite3
+import logging
+from array import array
+
+logger = logging.getLogger(__name__)
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+
+class Backend(object):
+    '''
+    Database to be fed to HyFd
+    '''
+    # NAMES OF THE COLUMNS, None IF THE DATABASE HAS NONE
+    column_names = None
+
+    def columns(self):
+        '''
+        Yields one array of codes per column
+        '''
+        raise NotImplementedError
+
+    def rows(self):
+        '''
+        Yields the records one at a time as lists of values
+        '''
+        raise NotImplementedError
+
+
+class CSVBackend(Backend):
+    '''
+    CSV file, decompressed on the fly according to its extension
+    '''
+    def __init__(self, path, separator=',', ignore_headers=False):
+        self.path = path
+        self.separator = separator
+        self.ignore_headers = ignore_headers
+
+    @property
+    def column_names(self):
+        '''
+        The ignored first line is taken as the header
+        '''
+        if not self.ignore_headers:
+            return None
+        with self._open() as fin:
+            return fin.readline().replace('\n','').split(self.separator)
+
+    def _open(self):
+        if self.path.endswith('.gz'):
+            return gzip.open(self.path, 'rt', encoding='utf8')
+        if self.path.endswith('.bz2'):
+            return bz2.open(self.path, 'rt', encoding='utf8')
+        if self.path.endswith('.xz'):
+            return lzma.open(self.path, 'rt', encoding='utf8')
+        if self.path.endswith('.zst'):
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError('Reading .zst files needs the zstandard package')
+            stream = zstandard.ZstdDecompressor().stream_reader(open(self.path, 'rb'), closefd=True)
+            return io.TextIOWrapper(stream, encoding='utf8')
+        return open(self.path, 'r', encoding='utf8')
+
+    def rows(self):
+        '''
+        Every row must have as many values as the first one, only a
+        final empty line is skipped
+        '''
+        natts = None
+        empty = None
+        with self._open() as fin:
+            if self.ignore_headers:
+                next(fin, None)
+            for number, line in enumerate(fin, 2 if self.ignore_headers else 1):
+                line = line.replace('\n','')
+                if empty is not None:
+                    # THE EMPTY LINE WAS NOT THE LAST ONE, IT IS A ROW
+                    natts = 1 if natts is None else natts
+                    yield self._check(empty, natts, number - 1)
+                    empty = None
+                if not line:
+                    empty = ['']
+                    continue
+                row = line.split(self.separator)
+                if natts is None:
+                    natts = len(row)
+                yield self._check(row, natts, number)
+
+    def _check(self, row, natts, number):
+        if natts is not None and len(row) != natts:
+            raise ValueError('{} line {}: {} values, expected {}'.format(self.path, number, len(row), natts))
+        return row
+
+    def columns(self):
+        '''
+        Streams the file once, encoding each value by its first appearance in its column
+        '''
+        dictionaries = None
+        columns = None
+        for row in self.rows():
+            if dictionaries is None:
+                dictionaries = [{} for _ in row]
+                columns = [array('i') for _ in row]
+            for dictionary, column, value in zip(dictionaries, columns, row):
+                column.append(dictionary.setdefault(value, len(dictionary)))
+        return iter(columns or [])
+
+
+class SQLiteBackend(Backend):
+    '''
+    Table of an SQLite database, the only table of the database if none is given
+    '''
+    def __init__(self, path, table=None):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        if table is None:
+            tables = [name for name, in self.conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+            if len(tables) != 1:
+                raise ValueError('{} has tables {}, choose one'.format(path, tables))
+            table = tables[0]
+        self.table = table
+        self.column_names = [info[1] for info in self.conn.execute('PRAGMA table_info({})'.format(quote(table)))]
+
+    def columns(self):
+        table = quote(self.table)
+        for name in self.column_names:
+            column = quote(name)
+            if sqlite3.sqlite_version_info >= (3, 25, 0):
+                query = 'SELECT DENSE_RANK() OVER (ORDER BY {0}) FROM {1} ORDER BY rowid'.format(column, table)
+                yield array('i', (code for code, in self.conn.execute(query)))
+            else:
+                dictionary = dict((value, code) for code, (value,) in enumerate(self.conn.execute('SELECT {0} FROM {1} GROUP BY {0}'.format(column, table))))
+                yield array('i', (dictionary[value] for value, in self.conn.execute('SELECT {} FROM {} ORDER BY rowid'.format(column, table))))
+
+    def rows(self):
+        for row in self.conn.execute('SELECT * FROM {} ORDER BY rowid'.format(quote(self.table))):
+            yield list(row)
+
+
+class ParquetBackend(Backend):
+    '''
+    Parquet file read with pyarrow
+    '''
+    def __init__(self, path):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Reading Parquet files needs the pyarrow package')
+        self.path = path
+        self.column_names = pyarrow.parquet.ParquetFile(path).schema_arrow.names
+        # STRING AND BINARY COLUMNS ARE READ AS STORED, WITHOUT DECODING THEIR DICTIONARY PAGES
+        self.file = pyarrow.parquet.ParquetFile(path, read_dictionary=self.column_names)
+
+    def columns(self):
+        '''
+        Columns are read as dictionaries and their indices used as codes,
+        values are never decoded. Nulls get a code of their own.
+        '''
+        for name in self.column_names:
+            chunked = self.file.read(columns=[name]).column(0)
+            if not hasattr(chunked.type, 'index_type'):
+                chunked = chunked.dictionary_encode()
+            chunked = chunked.unify_dictionaries()
+            codes = array('i')
+            for chunk in chunked.chunks:
+                codes.extend(chunk.indices.fill_null(len(chunk.dictionary)).to_pylist())
+            yield codes
+
+    def rows(self):
+        for batch in self.file.iter_batches():
+            columns = [column.to_pylist() for column in batch.columns]
+            for row in zip(*columns):
+                yield list(row)
+
+
+def quote(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def open_backend(path, separator=',', ignore_headers=False, table=None):
+    '''
+    Backend for path according to its extension
+    '''
+    if path.endswith(SQLITE_EXTENSIONS):
+        return SQLiteBackend(path, table)
+    if path.endswith(PARQUET_EXTENSIONS):
+        return ParquetBackend(path)
+    return CSVBackend(path, separator, ignore_headers)
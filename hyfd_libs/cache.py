@@ -0,0 +1,115 @@
+'''
+Persistent cache of what HyFd learns about a database
+
+Agree-sets (non-FDs), the minimal FDs and the keys found do not depend
+on the parameters of a run, only on the data, so they are stored under
+a fingerprint of the content of the database and of the options used to
+parse it. Attribute sets are stored as bitmasks over the original
+column ids, so entries do not depend on the order of the PLIs.
+The encoded columns of a database are also kept, pickled, so that
+runs with other options on the same data skip reading and encoding it.
+'''
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+CHUNK_SIZE = 1 << 20
+
+
+def content_hash(path):
+    '''
+    Hash of the content of the file in path, read once for all its fingerprints
+    '''
+    digest = hashlib.sha1()
+    with open(path, 'rb') as fin:
+        for chunk in iter(lambda: fin.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest
+
+def fingerprint(content, *options):
+    '''
+    Hash of the content of a file, given by content_hash, and the parsing options
+    '''
+    digest = content.copy()
+    digest.update(json.dumps(list(options)).encode('utf8'))
+    return digest.hexdigest()
+
+
+class ResultCache(object):
+    '''
+    One JSON file per fingerprint in directory
+    '''
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def path(self, key):
+        return os.path.join(self.directory, '{}.json'.format(key))
+
+    def _write(self, path, mode, dump):
+        '''
+        Calls dump on a temporary file of its own, so concurrent writers do not
+        mix their data, then moves it to path atomically
+        '''
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, mode) as fout:
+                dump(fout)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def load(self, key):
+        '''
+        returns a dictionary with non_fds (bitmasks), fds (pairs of lists,
+        None if no run finished) and keys (lists), or None if nothing is cached
+        '''
+        try:
+            with open(self.path(key), 'r') as fin:
+                entry = json.load(fin)
+        except (IOError, ValueError):
+            return None
+        if entry.get('version', None) != CACHE_VERSION:
+            return None
+        logger.info("Cache hit {}: {} non-FDs{}".format(key, len(entry['non_fds']), '' if entry['fds'] is None else ', {} FDs'.format(len(entry['fds']))))
+        return entry
+
+    def load_codes(self, key):
+        '''
+        returns the encoded columns of key, None if they are not cached
+        '''
+        try:
+            with open(self.path(key)[:-len('.json')] + '.codes', 'rb') as fin:
+                columns = pickle.load(fin)
+        except (IOError, EOFError, pickle.UnpicklingError):
+            return None
+        logger.info("Encoded columns of {} read from the cache".format(key))
+        return columns
+
+    def save_codes(self, key, columns):
+        '''
+        Writes the encoded columns of key, replacing the previous ones atomically
+        '''
+        path = self.path(key)[:-len('.json')] + '.codes'
+        self._write(path, 'wb', lambda fout: pickle.dump(columns, fout, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def save(self, key, non_fds, fds=None, keys=None):
+        '''
+        Writes the entry of key, replacing the previous one atomically
+        '''
+        entry = {
+            'version': CACHE_VERSION,
+            'non_fds': sorted(non_fds),
+            'fds': fds,
+            'keys': keys if keys is not None else [],
+        }
+        self._write(self.path(key), 'w', lambda fout: json.dump(entry, fout))
+        logger.info("Cached {} non-FDs{} in {}".format(len(non_fds), '' if fds is None else ' and {} FDs'.format(len(fds)), self.path(key)))
@@ -0,0 +1,173 @@
+'''
+Closure and implication queries over a cover of functional dependencies
+
+The cover is indexed once as bitmasks: for each FD the bitmask of its
+left hand side, the bitmask of its right hand side and the number of
+attributes in the left hand side, and for each attribute the FDs in
+whose left hand side it appears.
+Closures are computed with the linear algorithm of Beeri and Bernstein [1]
+(Lin Closure, see also canonical_to_minimal.py) and memoized by bitmask.
+Candidate keys are enumerated with the algorithm of Lucchesi and Osborn [2].
+
+[1] Beeri and Bernstein - Computational Problems Related to the Design of Normal Form Relational Schemas (1979)
+[2] Lucchesi and Osborn - Candidate Keys for Relations (1978)
+'''
+import json
+
+CACHE_SIZE = 1 << 16
+
+
+def to_mask(atts):
+    return sum(1 << att for att in set(atts))
+
+
+def to_atts(mask):
+    atts = []
+    att = 0
+    while mask:
+        if mask & 1:
+            atts.append(att)
+        mask >>= 1
+        att += 1
+    return atts
+
+
+class ClosureIndex(object):
+    '''
+    Index over a set of FDs lhs -> rhss answering closure, implication
+    and candidate key queries.
+    fds -- iterable of pairs (lhs, rhss) of iterables of attribute ids
+    n_atts -- number of attributes in the relation, by default
+    one more than the largest attribute id in fds
+    cache_size -- maximum number of closures kept in memory
+    '''
+    def __init__(self, fds, n_atts=None, cache_size=CACHE_SIZE):
+        self.lhss = []
+        self.rhss = []
+        self.counts = []
+        self.base = 0
+        universe = 0
+        for lhs, rhss in fds:
+            lhs_mask = to_mask(lhs)
+            rhs_mask = to_mask(rhss) & ~lhs_mask
+            universe |= lhs_mask | rhs_mask
+            if not rhs_mask:
+                continue
+            if not lhs_mask:
+                self.base |= rhs_mask
+                continue
+            self.lhss.append(lhs_mask)
+            self.rhss.append(rhs_mask)
+            self.counts.append(len(to_atts(lhs_mask)))
+        self.n_atts = n_atts if n_atts is not None else universe.bit_length()
+        self.full = (1 << self.n_atts) - 1
+        self.index = [[] for _ in range(self.n_atts)]
+        for fdi, lhs_mask in enumerate(self.lhss):
+            for att in to_atts(lhs_mask):
+                self.index[att].append(fdi)
+        self.cache_size = cache_size
+        self._cache = {}
+
+    @classmethod
+    def from_tree(cls, fd_tree, att_order_map=None, **kwargs):
+        '''
+        Index the FDs in an FDTree, renaming attribute i as att_order_map[i] if given
+        '''
+        if att_order_map is None:
+            fds = fd_tree.read_fds()
+        else:
+            fds = (([att_order_map[i] for i in lhs], [att_order_map[i] for i in rhss]) for lhs, rhss in fd_tree.read_fds())
+        return cls(fds, fd_tree.n_atts, **kwargs)
+
+    @classmethod
+    def from_json(cls, path, n_atts=None, **kwargs):
+        '''
+        Index the FDs in a file written by Output.write
+        '''
+        with open(path, 'r') as fin:
+            return cls(json.load(fin), n_atts, **kwargs)
+
+    def __len__(self):
+        return len(self.lhss)
+
+    def close_mask(self, mask):
+        '''
+        Closure of the attribute set given as a bitmask
+        '''
+        closure = self._cache.get(mask, None)
+        if closure is not None:
+            return closure
+        closure = mask | self.base
+        counts = list(self.counts)
+        update = closure
+        while update:
+            low = update & -update
+            update ^= low
+            att = low.bit_length() - 1
+            if att >= self.n_atts:
+                continue
+            for fdi in self.index[att]:
+                counts[fdi] -= 1
+                if counts[fdi] == 0:
+                    new = self.rhss[fdi] & ~closure
+                    closure |= new
+                    update |= new
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[mask] = closure
+        return closure
+
+    def closure(self, atts):
+        '''
+        Closure of a set of attributes
+        returns a sorted list
+        '''
+        return to_atts(self.close_mask(to_mask(atts)))
+
+    def implies(self, lhs, rhs):
+        '''
+        True if the cover implies lhs -> rhs
+        rhs -- attribute id or iterable of attribute ids
+        '''
+        rhs_mask = to_mask([rhs] if isinstance(rhs, int) else rhs)
+        return self.close_mask(to_mask(lhs)) & rhs_mask == rhs_mask
+
+    def is_superkey(self, atts):
+        return self.close_mask(to_mask(atts)) & self.full == self.full
+
+    def is_key(self, atts):
+        '''
+        True if atts is a candidate key, i.e. a minimal superkey
+        '''
+        mask = to_mask(atts)
+        return self.close_mask(mask) & self.full == self.full and self._minimize(mask) == mask
+
+    def _minimize(self, mask):
+        '''
+        Remove attributes from the superkey mask while it remains a superkey
+        '''
+        for att in to_atts(mask):
+            smaller = mask & ~(1 << att)
+            if self.close_mask(smaller) & self.full == self.full:
+                mask = smaller
+        return mask
+
+    def candidate_keys(self):
+        '''
+        Yields all candidate keys of the relation as sorted lists,
+        in time polynomial in the number of FDs and keys
+        '''
+        keys = [self._minimize(self.full)]
+        yield to_atts(keys[0])
+        ki = 0
+        while ki < len(keys):
+            key = keys[ki]
+            for lhs_mask, rhs_mask in zip(self.lhss, self.rhss):
+                if not rhs_mask & key:
+                    continue
+                superkey = lhs_mask | (key & ~rhs_mask)
+                if any(other & superkey == other for other in keys):
+                    continue
+                keys.append(self._minimize(superkey))
+                yield to_atts(keys[-1])
+            ki += 1
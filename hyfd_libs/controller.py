@@ -0,0 +1,75 @@
+'''
+Adaptive switching between the sampling and validation phases of HyFD
+
+Instead of the efficiency threshold and invalid FDs threshold of [1],
+the controller measures the wall time that each phase is paying at the
+margin for what it finds: the time per new agree-set over the last
+window runs of sampling (plus the induction time per non-FD), and the
+time per invalidated FD on the last level checked by validation.
+A phase hands over to the other one when the other one is cheaper.
+
+[1] Papenbrock et al - A Hybrid Approach to Functional Dependency Discovery (2016)
+'''
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+RECENT_RUNS = 8
+
+
+class AdaptiveController(object):
+    def __init__(self, recent_runs=RECENT_RUNS):
+        self.runs = deque(maxlen=recent_runs)
+        self.induction_cost = 0.0
+        self.validation_cost = None
+
+    @property
+    def sampling_cost(self):
+        '''
+        Seconds per new agree-set over the last window runs, including its induction
+        '''
+        if not bool(self.runs):
+            return None
+        new = sum(n for _, n in self.runs)
+        if new == 0:
+            return float('inf')
+        return sum(t for t, _ in self.runs) / new + self.induction_cost
+
+    def sampled(self, seconds, new_non_fds):
+        self.runs.append((seconds, new_non_fds))
+
+    def inducted(self, seconds, new_non_fds):
+        if new_non_fds > 0:
+            self.induction_cost = seconds / new_non_fds
+
+    def stop_sampling(self):
+        '''
+        True if validation is cheaper than sampling at the margin.
+        Before the first validation there is nothing to compare with and sampling goes on.
+        '''
+        sampling_cost = self.sampling_cost
+        if self.validation_cost is None or sampling_cost is None:
+            return False
+        if sampling_cost > self.validation_cost:
+            logger.info("Switching to validation: a new agree-set costs {} ms in sampling, an invalid FD {} ms in validation".format(ms(sampling_cost), ms(self.validation_cost)))
+            return True
+        return False
+
+    def validated(self, seconds, invalid_fds):
+        '''
+        Records a level of validation
+        returns True if sampling is cheaper than validation at the margin
+        '''
+        if invalid_fds == 0:
+            return False
+        self.validation_cost = seconds / invalid_fds
+        sampling_cost = self.sampling_cost
+        if sampling_cost is not None and self.validation_cost > sampling_cost:
+            logger.info("Switching to sampling: an invalid FD costs {} ms in validation, a new agree-set {} ms in sampling".format(ms(self.validation_cost), ms(sampling_cost)))
+            return True
+        return False
+
+
+def ms(seconds):
+    return round(seconds * 1000, 3)
@@ -0,0 +1,64 @@
+'''
+Changes between two versions of a table, for differential discovery
+
+Only the agree-sets of the pairs that involve a changed row can differ
+between the versions. Inserted rows can only add agree-sets, so the old
+FDs specialized with the agree-sets of the inserted rows are the new
+ones. Deleted rows can remove agree-sets, so the old agree-sets of the
+pairs of deleted rows are no longer known to hold and are left out of
+the negative cover the new run starts from.
+'''
+from hyfd_libs.sampling import match
+
+
+def changed_rows(old_rows, new_rows):
+    '''
+    Rows of the old version missing from the new one and rows of the
+    new version missing from the old one, rows compared as multisets
+    returns (deleted, inserted), lists of row numbers in each version
+    '''
+    old = {}
+    for i, row in enumerate(old_rows):
+        old.setdefault(tuple(row), []).append(i)
+    inserted = []
+    for j, row in enumerate(new_rows):
+        matches = old.get(tuple(row), None)
+        if bool(matches):
+            matches.pop()
+        else:
+            inserted.append(j)
+    deleted = sorted(i for matches in old.values() for i in matches)
+    return deleted, inserted
+
+
+def agree_sets(miner, rows):
+    '''
+    Agree-sets of the pairs of each row in rows with every other row
+    of the preprocessed miner, as bitmasks over the original attribute ids.
+    Rows sharing no value are not compared, their agree-set is empty.
+    returns set
+    '''
+    full = (1 << miner.natts) - 1
+    result = set()
+    for ri in rows:
+        record = miner.pli_records[ri]
+        partners = set()
+        for x, cluster in enumerate(record):
+            if cluster >= 0:
+                partners.update(miner.plis[x][cluster])
+        partners.discard(ri)
+        if len(partners) < miner.nrecs - 1:
+            result.add(0)
+        for rj in partners:
+            agree = match(record, miner.pli_records[rj])
+            result.add(sum(1 << miner.att_order_map[x] for x, v in enumerate(agree) if v))
+    # DUPLICATED ROWS AGREE ON EVERYTHING AND VIOLATE NOTHING
+    result.discard(full)
+    return result
+
+
+def fd_set(fds):
+    '''
+    FDs given as (lhs, rhss) pairs as a set of (lhs, rhs), lhs a sorted tuple
+    '''
+    return set((tuple(sorted(lhs)), rhs) for lhs, rhss in fds for rhs in rhss)
@@ -0,0 +1,329 @@
+'''
+Disk-backed storage for the out-of-core mode of HyFD [1]
+
+Column codes are stored row-major in a memory-mapped file of 32-bit ints
+(the pli_records of HyFd) and each PLI is stored as a pair of memory-mapped
+arrays: the row ids of all its clusters one after the other, and the offset
+at which each cluster starts.
+The files are built by external sorting, (value, row) pairs by value to
+write each PLI and (row, cluster) pairs by row to write the cluster ids,
+so memory only holds buffer_rows items per column and every file is
+written sequentially.
+
+[1] Papenbrock et al - A Hybrid Approach to Functional Dependency Discovery (2016)
+'''
+import os
+import mmap
+import heapq
+import pickle
+import shutil
+import operator
+import itertools
+import tempfile
+import logging
+from array import array
+
+from hyfd_libs.pli import PLI
+
+logger = logging.getLogger(__name__)
+
+BUFFER_ROWS = 1 << 16
+ITEMSIZE = array('i').itemsize
+# ITEMS PICKLED AT ONCE IN THE RUNS OF THE EXTERNAL SORT
+RUN_CHUNK = 4096
+# RUNS OPEN AT ONCE WHEN MERGING, MORE RUNS ARE MERGED IN SEVERAL LEVELS
+MERGE_FANIN = 64
+
+
+# ITEMS OF THE FIRST SORT ARE (TYPE NAME, VALUE, ROW): VALUES OF DIFFERENT TYPES
+# ARE NEVER COMPARED NOR EQUAL, AND EQUAL VALUES ARE ORDERED BY ROW
+value_key = operator.itemgetter(0, 1)
+
+
+def read_run(path):
+    with open(path, 'rb') as fin:
+        while True:
+            try:
+                chunk = pickle.load(fin)
+            except EOFError:
+                return
+            yield from chunk
+
+
+def read_ints(path, buffer_size):
+    with open(path, 'rb') as fin:
+        while True:
+            buff = array('i')
+            buff.frombytes(fin.read(buffer_size * ITEMSIZE))
+            if not bool(buff):
+                return
+            yield from buff
+
+
+def cluster_column(pairs, nrecs):
+    '''
+    Cluster id of each row from (row, cluster) pairs sorted by row, -1 for missing rows
+    '''
+    ri = 0
+    for rj, cid in pairs:
+        while ri < rj:
+            yield -1
+            ri += 1
+        yield cid
+        ri += 1
+    while ri < nrecs:
+        yield -1
+        ri += 1
+
+
+class DiskArray(object):
+    '''
+    Array of n ints stored in a memory-mapped file,
+    a new one or, with create=False, the n first ints of the file in path
+    '''
+    def __init__(self, path, n, create=True):
+        self.path = path
+        self.n = n
+        if create or os.path.getsize(path) < max(n, 1) * ITEMSIZE:
+            with open(path, 'ab' if not create else 'wb') as fout:
+                fout.truncate(max(n, 1) * ITEMSIZE)
+        self._fd = open(path, 'r+b')
+        self._mm = mmap.mmap(self._fd.fileno(), 0)
+        if hasattr(self._mm, 'madvise'):
+            self._mm.madvise(mmap.MADV_SEQUENTIAL)
+        self.view = memoryview(self._mm).cast('i')[:n]
+
+    def close(self):
+        self.view.release()
+        try:
+            self._mm.close()
+        except BufferError:
+            # views handed out are still referenced, the map is released with them
+            logger.debug("Views still alive on {}".format(self.path))
+        self._fd.close()
+
+
+class DiskPLI(PLI):
+    '''
+    PLI whose rows and offsets arrays are views on disk-backed arrays.
+    Clusters are read in chunks of at most buffer_rows row ids, clusters
+    larger than the buffer are handed out as views on the file.
+    '''
+    def __init__(self, att, rows, offsets, nrecs, buffer_rows=BUFFER_ROWS):
+        self._set_arrays(att, rows, offsets, nrecs)
+        self.buffer_rows = buffer_rows
+
+    def __repr__(self):
+        return '<DiskPLI>{}:{} clusters'.format(self.att, self._len)
+
+    def __iter__(self):
+        offsets = self.offsets
+        ci = 0
+        while ci < self._len:
+            start = offsets[ci]
+            if offsets[ci+1] - start > self.buffer_rows:
+                yield self.rows[start:offsets[ci+1]]
+                ci += 1
+                continue
+            cj = ci + 1
+            while cj < self._len and offsets[cj+1] - start <= self.buffer_rows:
+                cj += 1
+            chunk = self.rows[start:offsets[cj]].tolist()
+            for ck in range(ci, cj):
+                yield chunk[offsets[ck]-start:offsets[ck+1]-start]
+            ci = cj
+
+
+class DiskRecords(object):
+    '''
+    Row-major matrix of cluster ids (pli_records) stored on disk
+    '''
+    def __init__(self, codes, nrecs, natts):
+        self.codes = codes
+        self.nrecs = nrecs
+        self.natts = natts
+
+    def __len__(self):
+        return self.nrecs
+
+    def __getitem__(self, ri):
+        return self.codes[ri*self.natts:(ri+1)*self.natts]
+
+    def __iter__(self):
+        for ri in range(self.nrecs):
+            yield self[ri]
+
+
+class DiskStore(object):
+    '''
+    Encodes a database into disk-backed arrays in three passes:
+    the database is read once into sorted runs of (value, row) per column,
+    merging them gives the clusters of each PLI in value order, and
+    merging the (row, cluster) runs gives the cluster ids of each row.
+    '''
+    def __init__(self, directory=None, buffer_rows=BUFFER_ROWS):
+        self.directory = tempfile.mkdtemp(prefix='hyfd-', dir=directory)
+        self.buffer_rows = buffer_rows
+        self.arrays = []
+        self.nrecs = 0
+        self.natts = 0
+        self.plis = None
+        self.pli_records = None
+        self.att_order_map = None
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _array(self, name, n, create=True):
+        disk_array = DiskArray(self._path(name), n, create)
+        self.arrays.append(disk_array)
+        return disk_array.view
+
+    def _spill(self, items):
+        '''
+        Writes items sorted by key to a new run file
+        returns the path of the run
+        '''
+        items.sort()
+        return self._write_run(items)
+
+    def _write_run(self, items):
+        fd, path = tempfile.mkstemp(prefix='run-', dir=self.directory)
+        items = iter(items)
+        with os.fdopen(fd, 'wb') as fout:
+            while True:
+                chunk = list(itertools.islice(items, RUN_CHUNK))
+                if not bool(chunk):
+                    break
+                pickle.dump(chunk, fout, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+
+    def _merge(self, runs):
+        '''
+        Yields the items of the runs sorted by key, removing the runs once read
+        '''
+        runs = list(runs)
+        while len(runs) > MERGE_FANIN:
+            merged = self._write_run(heapq.merge(*[read_run(path) for path in runs[:MERGE_FANIN]]))
+            for path in runs[:MERGE_FANIN]:
+                os.remove(path)
+            runs = runs[MERGE_FANIN:] + [merged]
+        if len(runs) == 1:
+            yield from read_run(runs[0])
+        else:
+            yield from heapq.merge(*[read_run(path) for path in runs])
+        for path in runs:
+            os.remove(path)
+
+    def build(self, rows):
+        '''
+        rows -- iterable with the records of the database as lists of values
+        '''
+        # PASS 1: SORTED RUNS OF (VALUE, ROW) PER COLUMN, AT MOST buffer_rows ITEMS
+        # IN MEMORY FOR EACH COLUMN
+        buffers = None
+        value_runs = None
+        for row in rows:
+            if buffers is None:
+                self.natts = len(row)
+                buffers = [[] for _ in row]
+                value_runs = [[] for _ in row]
+            if len(row) != self.natts:
+                raise ValueError('Row {} has {} values, expected {}'.format(self.nrecs, len(row), self.natts))
+            for j, value in enumerate(row):
+                buffers[j].append((type(value).__name__, value, self.nrecs))
+            self.nrecs += 1
+            if self.nrecs % self.buffer_rows == 0:
+                for j in range(self.natts):
+                    value_runs[j].append(self._spill(buffers[j]))
+                    buffers[j] = []
+        for j in range(self.natts):
+            if bool(buffers[j]):
+                value_runs[j].append(self._spill(buffers[j]))
+        del buffers
+        logger.info("Sorted {} tuples and {} attributes in {}".format(self.nrecs, self.natts, self.directory))
+
+        # PASS 2: EACH GROUP OF EQUAL VALUES IS A CLUSTER, THE PLI IS WRITTEN SEQUENTIALLY,
+        # (ROW, CLUSTER) PAIRS GO TO RUNS SORTED BY ROW
+        n_clusters = []
+        for att in range(self.natts):
+            runs = []
+            pairs = []
+            cid = 0
+            clustered = 0
+            with open(self._path('rows.{}'.format(att)), 'wb') as rows_out, open(self._path('offsets.{}'.format(att)), 'wb') as offsets_out:
+                rows_buff = array('i')
+                offsets_buff = array('i')
+                for _, group in itertools.groupby(self._merge(value_runs[att]), key=value_key):
+                    first = next(group)[2]
+                    size = 1
+                    for _, _, ri in group:
+                        if size == 1:
+                            # NOT A SINGLETON, THE CLUSTER STARTS AT THE FIRST ROW
+                            offsets_buff.append(clustered)
+                            rows_buff.append(first)
+                            pairs.append((first, cid))
+                        rows_buff.append(ri)
+                        pairs.append((ri, cid))
+                        size += 1
+                        if len(rows_buff) >= self.buffer_rows:
+                            rows_buff.tofile(rows_out)
+                            rows_buff = array('i')
+                        if len(pairs) >= self.buffer_rows:
+                            runs.append(self._spill(pairs))
+                            pairs = []
+                    if size > 1:
+                        clustered += size
+                        cid += 1
+                    if len(offsets_buff) >= self.buffer_rows:
+                        offsets_buff.tofile(offsets_out)
+                        offsets_buff = array('i')
+                offsets_buff.append(clustered)
+                rows_buff.tofile(rows_out)
+                offsets_buff.tofile(offsets_out)
+            if bool(pairs):
+                runs.append(self._spill(pairs))
+            n_clusters.append((cid, clustered))
+            with open(self._path('clusters.{}'.format(att)), 'wb') as fout:
+                buff = array('i')
+                for value in cluster_column(self._merge(runs), self.nrecs):
+                    buff.append(value)
+                    if len(buff) >= self.buffer_rows:
+                        buff.tofile(fout)
+                        buff = array('i')
+                buff.tofile(fout)
+        number_of_parts = [n + self.nrecs - clustered for n, clustered in n_clusters]
+        self.att_order_map = sorted(range(self.natts), key=lambda x: number_of_parts[x], reverse=True)
+
+        # PASS 3: THE CLUSTER IDS OF EACH ROW, WRITTEN ROW-MAJOR IN THE ORDER OF THE PLIS
+        columns = [read_ints(self._path('clusters.{}'.format(att)), self.buffer_rows) for att in self.att_order_map]
+        with open(self._path('codes'), 'wb') as fout:
+            buff = array('i')
+            for record in zip(*columns):
+                buff.extend(record)
+                if len(buff) >= self.buffer_rows * self.natts:
+                    buff.tofile(fout)
+                    buff = array('i')
+            buff.tofile(fout)
+        for att in range(self.natts):
+            os.remove(self._path('clusters.{}'.format(att)))
+        codes = self._array('codes', self.nrecs * self.natts, create=False)
+
+        self.plis = []
+        for att in self.att_order_map:
+            n, clustered = n_clusters[att]
+            rows_array = self._array('rows.{}'.format(att), clustered, create=False)
+            offsets_array = self._array('offsets.{}'.format(att), n + 1, create=False)
+            self.plis.append(DiskPLI(att, rows_array, offsets_array, self.nrecs, self.buffer_rows))
+        self.pli_records = DiskRecords(codes, self.nrecs, self.natts)
+        return self
+
+    def close(self):
+        '''
+        Releases the arrays and removes their files
+        '''
+        self.plis = None
+        self.pli_records = None
+        for disk_array in self.arrays:
+            disk_array.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
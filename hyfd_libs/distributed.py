@@ -0,0 +1,412 @@
+'''
+Coordinator/worker mode for HyFD [1]
+
+Workers hold a hash-shard of the rows of the database, encoded with the
+global dictionaries computed by the coordinator. Workers run sampling over
+their shard and send back agree-sets. During validation the coordinator
+sends one level of the FDTree to every worker; each worker checks the
+candidate FDs on its shard and reports the violations it found along with
+the LHS->RHS signatures of the FDs that hold locally, bucketed by a hash of
+the LHS values. The coordinator hands each bucket to its worker, which merges
+the signatures of all shards, so that violations spanning two shards are
+detected by the workers in parallel.
+
+Messages are JSON documents prefixed by their length and travel over plain TCP.
+
+[1] Papenbrock et al - A Hybrid Approach to Functional Dependency Discovery (2016)
+'''
+import json
+import socket
+import struct
+import zlib
+import logging
+
+from hyfd_libs.backends import open_backend
+from hyfd_libs.efficiency import Efficiency
+from hyfd_libs.boolean_tree import BooleanTree
+from hyfd_libs.sampling import run_window, match
+from hyfd_libs.pli import PLI
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('!Q')
+ROWS_BATCH = 1000
+# REQUESTS A WORKER ANSWERS, ALONG WITH shutdown
+OPS = ('rows', 'build', 'sample', 'validate', 'merge', 'fetch')
+
+
+def send_msg(sock, msg):
+    '''
+    Sends a JSON message prefixed by its length
+    '''
+    data = json.dumps(msg).encode('utf8')
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+def _recv_exactly(sock, n):
+    chunks = []
+    while n > 0:
+        chunk = sock.recv(min(n, 1 << 20))
+        if not chunk:
+            raise ConnectionError('Connection closed by peer')
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b''.join(chunks)
+
+def recv_msg(sock):
+    '''
+    Receives a JSON message sent with send_msg
+    '''
+    size, = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    return json.loads(_recv_exactly(sock, size).decode('utf8'))
+
+def parse_address(address):
+    '''
+    'host:port' -> (host, port)
+    '''
+    host, port = address.rsplit(':', 1)
+    return (host or 'localhost', int(port))
+
+def shard_of(values, n_shards):
+    '''
+    Hash-shard of a list of values, the same in every process
+    '''
+    return zlib.crc32('\x1f'.join(map(str, values)).encode('utf8')) % n_shards
+
+
+class GlobalEncoder(object):
+    '''
+    Global dictionaries of the database.
+    Values are encoded by cluster id, clusters ordered by size, and values
+    appearing only once in the whole database are encoded as -1 (stripped).
+    Columns are ordered by number of parts as in the PLIs of HyFd.preproc.
+    '''
+    def __init__(self, path, separator=',', ignore_headers=False, table=None):
+        self.backend = open_backend(path, separator, ignore_headers, table)
+        self.nrecs = 0
+        self.natts = 0
+        self.dictionaries = None
+        self.att_order_map = None
+
+    def fit(self):
+        counts = None
+        for row in self.backend.rows():
+            if counts is None:
+                counts = [{} for _ in row]
+            for j, value in enumerate(row):
+                counts[j][value] = counts[j].get(value, 0) + 1
+            self.nrecs += 1
+        self.natts = len(counts)
+        self.dictionaries = []
+        number_of_parts = []
+        for col in counts:
+            clusters = sorted((v for v in col.items() if v[1] > 1), key=lambda k: k[1], reverse=True)
+            self.dictionaries.append(dict((value, ci) for ci, (value, _) in enumerate(clusters)))
+            number_of_parts.append(len(clusters) + self.nrecs - sum(c for _, c in clusters))
+        self.att_order_map = sorted(range(self.natts), key=lambda x: number_of_parts[x], reverse=True)
+        return self
+
+    def encode(self, row):
+        return [self.dictionaries[att].get(row[att], -1) for att in self.att_order_map]
+
+    def rows(self):
+        '''
+        Yields (row id, row, encoded row)
+        '''
+        for ri, row in enumerate(self.backend.rows()):
+            yield ri, row, self.encode(row)
+
+
+class Coordinator(object):
+    '''
+    Keeps the connections to the workers and dispatches requests to them.
+    Requests are sent to all workers before waiting for the answers so
+    that workers process them concurrently.
+    '''
+    def __init__(self, addresses):
+        self.addresses = addresses
+        self.socks = [socket.create_connection(parse_address(a)) for a in addresses]
+        logger.info("Connected to {} workers".format(len(self.socks)))
+
+    def __len__(self):
+        return len(self.socks)
+
+    def broadcast(self, msg):
+        for sock in self.socks:
+            send_msg(sock, msg)
+        return [recv_msg(sock) for sock in self.socks]
+
+    def request(self, msgs):
+        '''
+        Sends msgs[i] to worker i, returns their answers
+        '''
+        for sock, msg in zip(self.socks, msgs):
+            send_msg(sock, msg)
+        return [recv_msg(sock) for sock in self.socks]
+
+    def distribute(self, encoder):
+        '''
+        Sends every worker its shard of encoded rows
+        '''
+        batches = [[] for _ in self.socks]
+        for ri, values, row in encoder.rows():
+            wi = shard_of(values, len(self.socks))
+            batches[wi].append([ri, row])
+            if len(batches[wi]) == ROWS_BATCH:
+                send_msg(self.socks[wi], {'op': 'rows', 'rows': batches[wi]})
+                batches[wi] = []
+        for wi, batch in enumerate(batches):
+            if batch:
+                send_msg(self.socks[wi], {'op': 'rows', 'rows': batch})
+        return self.broadcast({'op': 'build', 'natts': encoder.natts})
+
+    def sample(self, efficiency_threshold):
+        return self.broadcast({'op': 'sample', 'efficiency_threshold': efficiency_threshold})
+
+    def validate(self, level):
+        '''
+        Validates a level of the FDTree given as a list of [lhs, rhss]
+        returns a list with the valid rhss of each candidate, whether the lhs
+        of each candidate is a key, the agree-sets of the violations found
+        and the number of rows checked
+        '''
+        answers = self.broadcast({'op': 'validate', 'level': level, 'shards': len(self.socks)})
+        row_checks = sum(a['row_checks'] for a in answers)
+        non_fds = [tuple(nfd) for a in answers for nfd in a['non_fds']]
+        masks = []
+        keys = []
+        for ci, (lhs, rhss) in enumerate(level):
+            mask = set(range(len(rhss)))
+            for a in answers:
+                mask.difference_update(a['results'][ci]['invalid'])
+            masks.append(mask)
+            keys.append(all(a['results'][ci]['unique'] for a in answers))
+        # CROSS-SHARD CHECKS, WORKER wb MERGES THE GROUPS OF ALL SHARDS IN BUCKET wb
+        checks = [[] for _ in self.socks]
+        for ci, mask in enumerate(masks):
+            if not mask and bool(level[ci][1]):
+                continue
+            for wb in range(len(self.socks)):
+                groups = [[wi, s1, s2, ti] for wi, a in enumerate(answers) for s1, s2, ti in a['results'][ci]['groups'][wb]]
+                if groups:
+                    checks[wb].append([ci, sorted(mask), groups])
+        suggestions = []
+        for merged in self.request([{'op': 'merge', 'checks': c} for c in checks]):
+            for ci, valid, unique, pairs in merged['results']:
+                masks[ci].intersection_update(valid)
+                keys[ci] = keys[ci] and unique
+                suggestions.extend((tuple(p1), tuple(p2)) for p1, p2 in pairs)
+        results = [[rhss[i] for i in sorted(mask)] for (_, rhss), mask in zip(level, masks)]
+        non_fds.extend(self.match_rows(suggestions))
+        return results, keys, non_fds, row_checks
+
+    def match_rows(self, pairs):
+        '''
+        Agree-sets of pairs of rows held by different workers
+        pairs -- list of ((worker, row id), (worker, row id))
+        '''
+        if not pairs:
+            return []
+        ids = [set() for _ in self.socks]
+        for pair in pairs:
+            for wi, ti in pair:
+                ids[wi].add(ti)
+        answers = self.request([{'op': 'fetch', 'ids': sorted(i)} for i in ids])
+        rows = {}
+        for wi, a in enumerate(answers):
+            for ti, row in a['rows']:
+                rows[(wi, ti)] = row
+        return [match(rows[p1], rows[p2]) for p1, p2 in pairs]
+
+    def close(self):
+        for sock in self.socks:
+            sock.close()
+
+
+class Worker(object):
+    '''
+    Holds a shard of encoded rows and answers the requests of the Coordinator
+    '''
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.row_ids = []
+        self.records = []
+        self.index = {}
+        self.natts = 0
+        self.plis = None
+        self.non_fds = None
+        self.efficiency_queue = None
+
+    def serve(self, address):
+        '''
+        Serves coordinators, one at a time, until a shutdown request arrives
+        '''
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(address)
+        server.listen(1)
+        logger.info("Worker listening on {}:{}".format(*address))
+        running = True
+        while running:
+            conn, peer = server.accept()
+            logger.info("Serving coordinator {}:{}".format(*peer))
+            self.reset()
+            with conn:
+                try:
+                    while True:
+                        msg = recv_msg(conn)
+                        if msg['op'] == 'shutdown':
+                            running = False
+                            break
+                        if msg['op'] not in OPS:
+                            logger.warning("Unknown request {}, closing the connection".format(msg['op']))
+                            break
+                        answer = getattr(self, msg['op'])(msg)
+                        if answer is not None:
+                            send_msg(conn, answer)
+                except ConnectionError:
+                    logger.info("Coordinator disconnected")
+        server.close()
+
+    def rows(self, msg):
+        for ri, row in msg['rows']:
+            self.index[ri] = len(self.records)
+            self.row_ids.append(ri)
+            self.records.append(row)
+
+    def build(self, msg):
+        '''
+        Builds the local PLIs. Clusters are formed by global codes so that
+        values repeated in other shards keep their rows.
+        '''
+        self.natts = msg['natts']
+        self.plis = []
+        for att in range(self.natts):
+            hashes = {}
+            for i, row in enumerate(self.records):
+                if row[att] >= 0:
+                    hashes.setdefault(row[att], []).append(i)
+            self.plis.append(PLI(att, sorted(hashes.values(), key=lambda k: len(k), reverse=True), len(self.records)))
+        return {'nrecs': len(self.records)}
+
+    def sample(self, msg):
+        '''
+        Runs sampling on the shard until the efficiency threshold is reached
+        returns the new agree-sets
+        '''
+        row_checks = 0
+        if self.efficiency_queue is None:
+            self.efficiency_queue = []
+            self.non_fds = BooleanTree()
+            for x, pli in enumerate(self.plis):
+                ileft = x-1
+                iright = x+1 if x+1 < self.natts else 0
+                pli.sort_clusters(key=lambda k: self.records[k][ileft] if self.records[k][ileft] >= 0 else self.records[k][iright])
+            for x in range(self.natts):
+                efficiency = Efficiency(att=x, pli=self.plis[x])
+                row_checks += run_window(efficiency, self.plis[x], self.records, self.non_fds)
+                if not efficiency.done:
+                    self.efficiency_queue.append(efficiency)
+
+        while bool(self.efficiency_queue):
+            self.efficiency_queue.sort(key=lambda k: k.eval(), reverse=True)
+            best_eff = self.efficiency_queue[0]
+            best_eff.window += 1
+            row_checks += run_window(best_eff, self.plis[best_eff.att], self.records, self.non_fds)
+            if best_eff.done:
+                del self.efficiency_queue[0]
+            if best_eff.eval() < msg['efficiency_threshold']:
+                break
+        return {
+            'non_fds': [list(map(int, nfd)) for nfd in self.non_fds],
+            'row_checks': row_checks,
+            'done': not bool(self.efficiency_queue),
+        }
+
+    def validate(self, msg):
+        '''
+        Checks each candidate [lhs, rhss] in the level on the shard.
+        For each candidate returns the positions of the invalid rhss and,
+        if some rhs holds locally, the signatures [lhs values, rhss values, row id]
+        of each group of rows sharing the lhs values, one list per worker
+        chosen by the hash of the lhs values, and whether the lhs is unique
+        in the shard.
+        '''
+        row_checks = 0
+        non_fds = BooleanTree()
+        results = []
+        for lhs, rhss in msg['level']:
+            s_lhs = sorted(lhs)
+            mask = list(range(len(rhss)))
+            if s_lhs:
+                clusters = self.plis[s_lhs[0]]
+            else:
+                clusters = [range(len(self.records))]
+            mapping = {}
+            unique = True
+            for cluster in clusters:
+                for ti in cluster:
+                    row = self.records[ti]
+                    row_checks += 1
+                    s1 = tuple(row[x] for x in s_lhs)
+                    if -1 in s1:
+                        continue
+                    s2 = [row[x] for x in rhss]
+                    if s1 not in mapping:
+                        mapping[s1] = (s2, ti)
+                        continue
+                    unique = False
+                    s3, tj = mapping[s1]
+                    diff = [i for i in mask if s2[i] == -1 or s2[i] != s3[i]]
+                    if diff:
+                        non_fds.append(match(self.records[tj], row))
+                        for i in diff:
+                            mask.remove(i)
+                        if not mask:
+                            break
+                if rhss and not mask:
+                    break
+            invalid = [i for i in range(len(rhss)) if i not in mask]
+            groups = [[] for _ in range(msg['shards'])]
+            # A CANDIDATE WITHOUT RHSS ONLY CHECKS WHETHER THE LHS IS UNIQUE
+            if mask or not rhss:
+                for s1, (s2, ti) in mapping.items():
+                    groups[shard_of(s1, msg['shards'])].append([s1, s2, self.row_ids[ti]])
+            results.append({'invalid': invalid, 'groups': groups, 'unique': unique})
+        return {
+            'results': results,
+            'non_fds': [list(map(int, nfd)) for nfd in non_fds],
+            'row_checks': row_checks,
+        }
+
+    def merge(self, msg):
+        '''
+        Checks the candidates [ci, valid rhs positions, groups] on the
+        signatures [worker, lhs values, rhss values, row id] of all shards
+        returns [ci, positions still valid, whether no lhs values repeat,
+        pairs of (worker, row id) violating some rhs] for each candidate
+        '''
+        results = []
+        for ci, mask, groups in msg['checks']:
+            mapping = {}
+            unique = True
+            pairs = []
+            for wi, s1, s2, ti in groups:
+                s1 = tuple(s1)
+                if s1 not in mapping:
+                    mapping[s1] = (s2, wi, ti)
+                    continue
+                unique = False
+                s3, wj, tj = mapping[s1]
+                diff = [i for i in mask if s2[i] == -1 or s2[i] != s3[i]]
+                if diff:
+                    pairs.append([[wj, tj], [wi, ti]])
+                    mask = [i for i in mask if i not in diff]
+                    if not mask:
+                        break
+            results.append([ci, mask, unique, pairs])
+        return {'results': results}
+
+    def fetch(self, msg):
+        return {'rows': [[ri, self.records[self.index[ri]]] for ri in msg['ids']]}
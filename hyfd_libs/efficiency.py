@@ -1,5 +1,11 @@
+import random
 from math import factorial as fac
 
+# CLUSTERS WITH AT LEAST THIS MANY TUPLES ARE SAMPLED AT RANDOM
+LARGE_CLUSTER = 256
+# PASSES OVER THE TUPLES OF A SET OF COMPARISON SUGGESTIONS
+FOCUS_ROUNDS = 4
+
 def binomial(x, y):
     try:
         binom = fac(x) // fac(y) // fac(x - y)
@@ -8,9 +14,14 @@ def binomial(x, y):
     return binom
 
 class Efficiency(object):
+    '''
+    Yield of the sorted-neighbourhood windows over the clusters of the PLI of att,
+    subclasses without a PLI set their own total
+    '''
+    strategy = 'window'
     def __init__(self, att, pli, window=2, comps=0, results=0.0):
         self.att = att
-        self.total = sum([binomial(len(cluster), 2) for cluster in pli])
+        self.total = sum([binomial(size, 2) * n for size, n in pli.histogram().items()]) if pli is not None else 0
         self.window = window
         self.comps = comps
         self.results = results
@@ -28,4 +39,31 @@ class Efficiency(object):
         return "[a:{}|T:{}|W:{}|C:{}|R:{}|E:{}||D:{}]".format(self.att, self.total, self.window, self.comps, self.results, self.eval(), self.done)
     def __repr__(self):
         return self.__str__()
+
+class RandomEfficiency(Efficiency):
+    '''
+    Yield of random pairs of tuples within the clusters of the PLI of att
+    with at least LARGE_CLUSTER tuples, window counts the runs
+    '''
+    strategy = 'random'
+    def __init__(self, att, pli, seed=0):
+        super(RandomEfficiency, self).__init__(att, None, window=0)
+        sizes = list(pli.cluster_sizes())
+        self.clusters = [i for i, size in enumerate(sizes) if size >= LARGE_CLUSTER]
+        self.total = sum([sizes[i] * (sizes[i]-1) // 2 for i in self.clusters])
+        self.done = not bool(self.clusters)
+        self.rng = random.Random(seed)
+
+class FocusedEfficiency(Efficiency):
+    '''
+    Yield of comparing the tuples named in comparison suggestions with
+    random tuples of their clusters, window counts the runs
+    '''
+    strategy = 'focused'
+    def __init__(self, rows, n_atts, seed=0):
+        super(FocusedEfficiency, self).__init__(None, None, window=0)
+        self.rows = sorted(set(rows))
+        self.total = len(self.rows) * n_atts * FOCUS_ROUNDS
+        self.done = not bool(self.rows)
+        self.rng = random.Random(seed)
         
\ No newline at end of file
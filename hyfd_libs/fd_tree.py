@@ -224,6 +224,8 @@
 '''
 import logging
 
+from hyfd_libs.closure import ClosureIndex
+
 logger = logging.getLogger(__name__)
 
 class FDCollection(object):
@@ -239,13 +241,95 @@ class FDCollection(object):
     def read_fds(self):
         raise NotImplementedError
 
-    
+
+class GeneralizationIndex(object):
+    '''
+    Subset-query index over the LHSs of the FDs in the tree.
+    There is one index per RHS attribute. Each LHS takes a slot, and for
+    each attribute a bitset (an int) holds the slots of the LHSs containing it,
+    so the LHSs contained in X are the live slots outside the union of the
+    bitsets of the attributes not in X, n_atts operations on ints whatever the number of FDs.
+    '''
+    def __init__(self, n_atts):
+        self.n_atts = n_atts
+        self.slots = [{} for _ in range(n_atts)]
+        self.free = [[] for _ in range(n_atts)]
+        self.live = [0]*n_atts
+        self.with_att = [[0]*n_atts for _ in range(n_atts)]
+
+    def add(self, mask, rhs):
+        slots = self.slots[rhs]
+        if mask in slots:
+            return
+        slot = self.free[rhs].pop() if bool(self.free[rhs]) else len(slots)
+        slots[mask] = slot
+        bit = 1 << slot
+        self.live[rhs] |= bit
+        with_att = self.with_att[rhs]
+        for att in range(self.n_atts):
+            if mask >> att & 1:
+                with_att[att] |= bit
+
+    def remove(self, mask, rhs):
+        slot = self.slots[rhs].pop(mask, None)
+        if slot is None:
+            return
+        bit = 1 << slot
+        self.live[rhs] &= ~bit
+        with_att = self.with_att[rhs]
+        for att in range(self.n_atts):
+            if mask >> att & 1:
+                with_att[att] &= ~bit
+        self.free[rhs].append(slot)
+
+    def has_generals(self, mask, rhs):
+        '''
+        True if some lhs->rhs in the index has lhs contained in mask
+        '''
+        candidates = self.live[rhs]
+        with_att = self.with_att[rhs]
+        for att in range(self.n_atts):
+            if not candidates:
+                return False
+            if not mask >> att & 1:
+                candidates &= ~with_att[att]
+        return candidates != 0
+
+    def blocked(self, mask, rhs):
+        '''
+        Answers has_generals for all LHSs mask|(1<<b) at once.
+        returns a bitmask with bit b set if mask|(1<<b) -> rhs has a
+        generalization in the index, all bits set if mask -> rhs has one
+        '''
+        live = self.live[rhs]
+        if not live:
+            return 0
+        with_att = self.with_att[rhs]
+        outside = [att for att in range(self.n_atts) if not mask >> att & 1]
+        # SLOTS WITH AT LEAST ONE AND AT LEAST TWO ATTRIBUTES OUTSIDE MASK
+        once = 0
+        twice = 0
+        for att in outside:
+            twice |= once & with_att[att]
+            once |= with_att[att]
+        if live & ~once:
+            return -1
+        single = live & ~twice
+        result = 0
+        for att in outside:
+            if with_att[att] & single:
+                result |= 1 << att
+        return result
+
+
 class FDNode(object):
     def __init__(self, att=-1, n_atts=0):
         self.att = att
         # self.idx = [True]*n_atts
         self.link = {}
         self.parent = None
+        self.depth = 0
+        self.mask = 0
         self._rhs=[False]*n_atts
         self.active = False
     
@@ -286,6 +370,8 @@ class FDNode(object):
         # self.idx[child.att] = False
         self.link[child.att] = child
         child.parent = self
+        child.depth = self.depth + 1
+        child.mask = self.mask | (1 << child.att)
 
     def remove_rhs(self, rhs):
         self._rhs[rhs] = False
@@ -298,44 +384,59 @@ class FDTree(FDCollection):
     Keeps a set of FDs stored in a tree.
     Implemented using descriptions found in [1]
     '''
-    def __init__(self, n_atts=0):
+    def __init__(self, n_atts=0, max_lhs=None):
         '''
         Initializes the object by setting the number of attributes
         contained in the functional dependencies to be stored.
         The tree only holds a reference to the root node.
+        With max_lhs, specialization never creates nodes deeper than max_lhs.
         '''
         super(FDTree, self).__init__(n_atts)
+        self.max_lhs = max_lhs
         self.root = FDNode(n_atts=self.n_atts)
         self._n_fds = 0
-
-    def _level_and_recurse(self, current_node, sought_depth, depth=0):
+        self._keys = []
+        # ACTIVE NODES BY DEPTH, DICTS KEEP INSERTION ORDER
+        self._levels = [{}]
+        self._generals = GeneralizationIndex(self.n_atts)
+        # CLOSURE INDEX OF l_close, BUILT ON DEMAND AND DROPPED WHEN THE FDs CHANGE
+        self._closure = None
+
+    def _index(self, node):
+        '''
+        Adds an active node to the bucket of its depth
         '''
-        Recursive function searching within the tree
-        for all nodes at a given depth.
-        Nodes do not store information on its depth
-        so the depth is calculated along with the navigation
-        by means of the depth parameter
+        while len(self._levels) <= node.depth:
+            self._levels.append({})
+        self._levels[node.depth][node] = None
 
-        
-        current_node -- FDNode, Current node in the navigation
-        sought_depth -- int, Target depth
-        depth -- int, current depth (default 0)
+    def _unindex(self, node):
         '''
-        if sought_depth == depth:
-            yield current_node
-        else:
-            for att in sorted(current_node.link.keys()):
-                for i in self._level_and_recurse(current_node.link[att], sought_depth, depth+1):
-                    yield i
+        Removes a node that is no longer active from the bucket of its depth
+        '''
+        self._levels[node.depth].pop(node, None)
 
     def get_level(self, sought_depth):
         '''
-        Yields all nodes at a given depth by means
+        Returns all active nodes at a given depth.
+        Nodes are kept in a bucket per depth, the cost is
+        proportional to the number of nodes in the level.
 
         sought_depth -- int, Target depth
         '''
-        for i in self._level_and_recurse(self.root, sought_depth):
-            yield i
+        if sought_depth >= len(self._levels):
+            return []
+        return list(self._levels[sought_depth])
+
+    @property
+    def depth(self):
+        '''
+        Depth of the deepest active node
+        '''
+        for depth in range(len(self._levels)-1, -1, -1):
+            if bool(self._levels[depth]):
+                return depth
+        return 0
 
     def _print_and_recurse(self, current_node, depth=1):
         '''
@@ -422,6 +523,7 @@ class FDTree(FDCollection):
         current_node = self.root
         s_lhs = sorted(lhs,reverse=True)
         self._n_fds += len(rhss)
+        self._closure = None
 
         while bool(s_lhs):
             next_att = s_lhs.pop()
@@ -432,7 +534,11 @@ class FDTree(FDCollection):
                 new_node = FDNode(att=next_att, n_atts=self.n_atts)
                 current_node.add_child(new_node)
                 current_node = new_node
+        for rhs in rhss:
+            if not current_node._rhs[rhs]:
+                self._generals.add(current_node.mask, rhs)
         current_node.set_rhss(rhss)
+        self._index(current_node)
         
         return new_node
 
@@ -488,10 +594,7 @@ class FDTree(FDCollection):
         """
         rhs contains a single attribute
         """
-        slhs = sorted(lhs)
-        for old_lhs, old_rhs in self._check_and_recurse(self.root, slhs, rhs):
-            return True
-        return False
+        return self._generals.has_generals(sum(1 << att for att in lhs), rhs)
 
     def get_fd_and_generals(self, lhs, rhs):
         slhs = sorted(lhs)
@@ -504,6 +607,7 @@ class FDTree(FDCollection):
 
         '''
         self._n_fds -= 1
+        self._closure = None
         current_node = self.root
         s_lhs = sorted(lhs,reverse=True)
         while bool(s_lhs):
@@ -512,6 +616,9 @@ class FDTree(FDCollection):
             if not current_node:
                 raise KeyError
         current_node.remove_rhs(rhs)
+        self._generals.remove(current_node.mask, rhs)
+        if not current_node.active:
+            self._unindex(current_node)
         
 
     def _specialize_and_recurse(self, current_node, lhs, rhss, pointer=0):
@@ -527,13 +634,28 @@ class FDTree(FDCollection):
             if current_node._rhs[rhs]:
                 #REMOVE
                 current_node.remove_rhs(rhs)
+                self._generals.remove(current_node.mask, rhs)
+                if not current_node.active:
+                    self._unindex(current_node)
                 self._n_fds -= 1
+                if self.max_lhs is not None and current_node.depth >= self.max_lhs:
+                    # THE SPECIALIZATIONS WOULD HAVE MORE THAN max_lhs ATTRIBUTES
+                    continue
                 invalid_lhs = current_node.get_lhs()
+                # ALL CANDIDATES invalid_lhs+new_att ARE CHECKED FOR GENERALIZATIONS AT ONCE
+                blocked = self._generals.blocked(current_node.mask, rhs)
+                if blocked == -1:
+                    continue
                 # for new_att in (i for i in rhss if i != rhs):
                 for new_att in (i for i in range(self.n_atts) if i not in lhs and i != rhs):
+                    if blocked >> new_att & 1:
+                        continue
                     new_lhs = invalid_lhs.union([new_att])
-                    if not self.fd_has_generals(new_lhs, rhs):
-                        yield self.add(new_lhs, [rhs])
+                    if self.has_key(new_lhs, strict=True):
+                        # THE KEY DETERMINES rhs, new_lhs->rhs IS NOT MINIMAL,
+                        # BUT key->rhs ITSELF MAY BE
+                        continue
+                    yield self.add(new_lhs, [rhs])
 
                     # new_lhs = invalid_lhs.union([new_att])
                     # if self.fd_has_generals(new_lhs, rhs):
@@ -542,8 +664,38 @@ class FDTree(FDCollection):
 
                     
 
+    def add_key(self, lhs):
+        '''
+        Registers lhs as a unique column combination (key).
+        Only minimal keys are kept.
+        returns True if lhs is a new minimal key
+        '''
+        mask = sum(1 << att for att in lhs)
+        if any(key & mask == key for key in self._keys):
+            return False
+        self._keys = [key for key in self._keys if key & mask != mask]
+        self._keys.append(mask)
+        return True
+
+    def has_key(self, lhs, strict=False):
+        '''
+        True if lhs contains a key, i.e. lhs is unique and any FD
+        with a strict superset of the key in the left hand side is not minimal.
+        With strict, only keys strictly contained in lhs count.
+        '''
+        mask = sum(1 << att for att in lhs)
+        return any(key & mask == key and (not strict or key != mask) for key in self._keys)
+
+    def read_keys(self):
+        '''
+        Read all minimal keys found so far
+        '''
+        for key in self._keys:
+            yield set(att for att in range(self.n_atts) if key >> att & 1)
+
     def specialize(self, lhs, rhss):
         slhs = sorted(lhs)
+        self._closure = None
         out = list(self._specialize_and_recurse(self.root, slhs, rhss))
         return out 
             
@@ -551,14 +703,46 @@ class FDTree(FDCollection):
 
 
     def l_close(self, pat):
-        newpat = set(pat)
-
-        while True:
-            complement = reduce(set.union, [set([])]+[rhs for rhs in self.find_rhss(newpat)])
-            if complement.issubset(newpat):
-                break
-            newpat.update(complement)
-        return newpat
+        '''
+        Closure of the set of attributes pat under the FDs in the tree,
+        the index is built once and answers from its cache until the FDs change
+        '''
+        if self._closure is None:
+            self._closure = ClosureIndex.from_tree(self)
+        return set(self._closure.closure(pat))
+
     @property
     def n_fds(self):
-        return self._n_fds
\ No newline at end of file
+        return self._n_fds
+
+
+if __name__ == "__main__":
+    # CHECKS THE GENERALIZATION INDEX AGAINST A SCAN OF ITS LHSs, WITH MANY FDs PER RHS
+    import random
+    logging.basicConfig(level=logging.INFO, format='%(name)s - %(levelname)s - %(message)s')
+    rng = random.Random(0)
+    n_atts = 16
+    index = GeneralizationIndex(n_atts)
+    lhss = [set() for _ in range(n_atts)]
+    for step in range(20000):
+        rhs = rng.randrange(n_atts)
+        if step % 3 == 2 and bool(lhss[rhs]):
+            mask = rng.choice(sorted(lhss[rhs]))
+            index.remove(mask, rhs)
+            lhss[rhs].discard(mask)
+        else:
+            mask = rng.getrandbits(n_atts) & rng.getrandbits(n_atts) & ~(1 << rhs)
+            index.add(mask, rhs)
+            lhss[rhs].add(mask)
+        if step % 10 == 0:
+            query = rng.getrandbits(n_atts) & ~(1 << rhs)
+            generals = [other for other in lhss[rhs] if other & query == other]
+            assert index.has_generals(query, rhs) == bool(generals)
+            expected = -1 if bool(generals) else 0
+            if expected == 0:
+                for other in lhss[rhs]:
+                    outside = other & ~query
+                    if outside & (outside - 1) == 0:
+                        expected |= outside
+            assert index.blocked(query, rhs) == expected
+    logging.info("GeneralizationIndex agrees with the scan of {} LHSs".format(sum(len(masks) for masks in lhss)))
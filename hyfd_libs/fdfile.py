@@ -0,0 +1,161 @@
+'''
+Compact binary files of FDs with a lazy, memory-mapped reader
+
+A file starts with a fixed header (magic, version, width of the
+bitmasks in bytes, number of attributes, number of records, length of
+the metadata) followed by the metadata of the dataset as JSON (column
+names, number of rows, ...) padded to 8 bytes, and by one record per
+LHS, as in the JSON output: the bitmask of the LHS and the bitmask of
+its RHSs, each of width bytes, little-endian, bit i for column i.
+Records have a fixed size, so the reader maps the file and decodes the
+records it is asked for, without loading the file.
+'''
+import mmap
+import json
+import struct
+
+from hyfd_libs.closure import to_mask, to_atts
+
+MAGIC = b'HYFD'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIQI')
+# BYTES OF RECORDS WRITTEN AT ONCE
+BUFFER_SIZE = 1 << 20
+
+
+def mask_width(n_atts):
+    return max(1, (n_atts + 7) // 8)
+
+
+def write_fds(path, fds, n_atts, metadata=None):
+    '''
+    Writes the (lhs, rhss) pairs of fds in the binary format
+    returns the number of records written
+    '''
+    width = mask_width(n_atts)
+    meta = json.dumps(metadata or {}).encode('utf8')
+    meta += b' ' * (-(HEADER.size + len(meta)) % 8)
+    n_records = 0
+    with open(path, 'wb') as fout:
+        fout.write(HEADER.pack(MAGIC, VERSION, width, n_atts, 0, len(meta)))
+        fout.write(meta)
+        buffer = bytearray()
+        for lhs, rhss in fds:
+            buffer += to_mask(lhs).to_bytes(width, 'little')
+            buffer += to_mask(rhss).to_bytes(width, 'little')
+            n_records += 1
+            if len(buffer) >= BUFFER_SIZE:
+                fout.write(buffer)
+                buffer = bytearray()
+        fout.write(buffer)
+        # THE NUMBER OF RECORDS IS ONLY KNOWN AT THE END
+        fout.seek(0)
+        fout.write(HEADER.pack(MAGIC, VERSION, width, n_atts, n_records, len(meta)))
+    return n_records
+
+
+class FDFile(object):
+    '''
+    Read-only view of a binary FD file.
+    Iterating yields (lhs, rhss) as sorted lists of column ids,
+    masks and select decode the records lazily.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # EMPTY FILES CANNOT BE MAPPED
+            self.file.close()
+            raise ValueError('{} is not a binary FD file'.format(path))
+        if len(self.map) < HEADER.size:
+            self.close()
+            raise ValueError('{} is not a binary FD file'.format(path))
+        magic, version, self.width, self.n_atts, self.n_records, meta_size = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError('{} is not a binary FD file (version {})'.format(path, VERSION))
+        self.metadata = json.loads(self.map[HEADER.size:HEADER.size+meta_size].decode('utf8'))
+        self.columns = self.metadata.get('columns', None)
+        self.offset = HEADER.size + meta_size
+        self.record_size = 2 * self.width
+
+    def __len__(self):
+        return self.n_records
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if getattr(self, 'map', None) is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def mask(self, i):
+        '''
+        (lhs, rhss) bitmasks of record i
+        '''
+        if not 0 <= i < self.n_records:
+            raise IndexError(i)
+        start = self.offset + i * self.record_size
+        return (int.from_bytes(self.map[start:start+self.width], 'little'),
+                int.from_bytes(self.map[start+self.width:start+self.record_size], 'little'))
+
+    def masks(self):
+        for i in range(self.n_records):
+            yield self.mask(i)
+
+    def __getitem__(self, i):
+        lhs, rhss = self.mask(i)
+        return to_atts(lhs), to_atts(rhss)
+
+    def __iter__(self):
+        for lhs, rhss in self.masks():
+            yield to_atts(lhs), to_atts(rhss)
+
+    def select(self, rhs=None, within=None, contains=None, max_lhs=None):
+        '''
+        Yields the (lhs, rhss) records with rhs among the RHSs (rhss is then [rhs]),
+        the LHS a subset of within, a superset of contains and at most max_lhs attributes
+        '''
+        within = to_mask(within) if within is not None else None
+        contains = to_mask(contains) if contains is not None else 0
+        for lhs, rhss in self.masks():
+            if rhs is not None:
+                if not rhss >> rhs & 1:
+                    continue
+                rhss = 1 << rhs
+            if within is not None and lhs & ~within:
+                continue
+            if lhs & contains != contains:
+                continue
+            if max_lhs is not None and bin(lhs).count('1') > max_lhs:
+                continue
+            yield to_atts(lhs), to_atts(rhss)
+
+
+def json_to_binary(json_path, path, n_atts=None, metadata=None):
+    '''
+    Converts an FD file of the JSON output, n_atts defaults to the largest column id found plus one
+    returns the number of records written
+    '''
+    with open(json_path, 'r') as fin:
+        fds = json.load(fin)
+    if n_atts is None:
+        n_atts = 1 + max([att for lhs, rhss in fds for att in lhs + rhss] or [-1])
+    return write_fds(path, fds, n_atts, metadata)
+
+
+def binary_to_json(path, json_path):
+    '''
+    Converts a binary FD file to the JSON output
+    returns the number of records written
+    '''
+    with FDFile(path) as fds, open(json_path, 'w') as fout:
+        json.dump([[lhs, rhss] for lhs, rhss in fds], fout)
+        return len(fds)
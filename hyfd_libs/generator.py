@@ -0,0 +1,157 @@
+'''
+Synthetic tables with planted FDs, for scaling tests
+
+Values of free columns are drawn from their own cardinality with a
+uniform or Zipf distribution. The value of the RHS of a planted FD is a
+hash of the values of its LHS, mapped through the distribution of the
+RHS, so every planted FD holds whatever the number of rows, and rows are
+generated one at a time without remembering the LHS values already seen.
+The planted FDs hold but need not be minimal, and other FDs may hold by
+chance on small tables.
+'''
+import gzip
+import random
+import bisect
+import hashlib
+
+from hyfd_libs.closure import ClosureIndex
+
+# DUPLICATES ARE COPIES OF ONE OF THE LAST ROWS GENERATED
+RECENT_ROWS = 1024
+
+
+class Column(object):
+    '''
+    Value distribution of a column, values are ints in range(cardinality)
+    '''
+    def __init__(self, cardinality, skew=0.0):
+        self.cardinality = cardinality
+        self.cumulative = None
+        if skew > 0:
+            weights = [1.0 / (rank ** skew) for rank in range(1, cardinality+1)]
+            total = sum(weights)
+            acc = 0.0
+            self.cumulative = []
+            for weight in weights:
+                acc += weight / total
+                self.cumulative.append(acc)
+
+    def value(self, u):
+        '''
+        Value at quantile u in [0, 1)
+        '''
+        if self.cumulative is None:
+            return int(u * self.cardinality)
+        return min(bisect.bisect_right(self.cumulative, u), self.cardinality-1)
+
+
+class TableGenerator(object):
+    '''
+    Rows of a table with n_atts columns where each lhs -> rhs in fds holds
+    cardinalities -- one per column
+    skew -- 0 for uniform values, the exponent of a Zipf distribution otherwise
+    duplicates -- ratio of rows that copy a previous row
+    nulls -- ratio of empty values in the columns that are not RHSs of planted FDs
+    '''
+    def __init__(self, cardinalities, fds=(), skew=0.0, duplicates=0.0, nulls=0.0, seed=0):
+        self.n_atts = len(cardinalities)
+        self.columns = [Column(cardinality, skew) for cardinality in cardinalities]
+        self.duplicates = duplicates
+        self.nulls = nulls
+        self.seed = seed
+        self.fds = {}
+        for lhs, rhs in fds:
+            if rhs in self.fds:
+                raise ValueError('Column {} is the RHS of more than one planted FD'.format(rhs))
+            if rhs in lhs or not all(0 <= att < self.n_atts for att in list(lhs) + [rhs]):
+                raise ValueError('Invalid planted FD {} -> {} over {} columns'.format(list(lhs), rhs, self.n_atts))
+            self.fds[rhs] = sorted(lhs)
+        self.order = self._order()
+
+    def _order(self):
+        '''
+        Columns in an order where the LHS of each planted FD comes before its RHS
+        '''
+        order, state = [], {}
+        def visit(att):
+            if state.get(att) == 'done':
+                return
+            if state.get(att) == 'visiting':
+                raise ValueError('Planted FDs form a cycle through column {}'.format(att))
+            state[att] = 'visiting'
+            for lhs_att in self.fds.get(att, []):
+                visit(lhs_att)
+            state[att] = 'done'
+            order.append(att)
+        for att in range(self.n_atts):
+            visit(att)
+        return order
+
+    def _hash(self, rhs, values):
+        '''
+        Quantile in [0, 1) determined by the values of the LHS of rhs
+        '''
+        digest = hashlib.blake2b('{}|{}|{}'.format(self.seed, rhs, values).encode('utf8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') / float(1 << 64)
+
+    def rows(self, n_rows):
+        '''
+        Yields n_rows rows as lists of values, None for empty values
+        '''
+        rng = random.Random(self.seed)
+        recent = []
+        for ri in range(n_rows):
+            if bool(recent) and rng.random() < self.duplicates:
+                row = list(rng.choice(recent))
+            else:
+                row = [None] * self.n_atts
+                for att in self.order:
+                    lhs = self.fds.get(att, None)
+                    if lhs is not None:
+                        row[att] = self.columns[att].value(self._hash(att, [row[x] for x in lhs]))
+                    elif rng.random() < self.nulls:
+                        row[att] = None
+                    else:
+                        row[att] = self.columns[att].value(rng.random())
+            if len(recent) < RECENT_ROWS:
+                recent.append(row)
+            else:
+                recent[ri % RECENT_ROWS] = row
+            yield row
+
+    def planted(self):
+        '''
+        Planted FDs in the format of the output of HyFd
+        returns list of [lhs, [rhs]]
+        '''
+        return [[lhs, [rhs]] for rhs, lhs in sorted(self.fds.items())]
+
+
+def write_csv(path, rows, separator=',', codes=False):
+    '''
+    Streams rows to path, compressed if it ends in .gz.
+    Values are written as 'v<code>', or as the codes themselves with codes=True
+    '''
+    fout = gzip.open(path, 'wt', encoding='utf8') if path.endswith('.gz') else open(path, 'w', encoding='utf8')
+    n_rows = 0
+    with fout:
+        for row in rows:
+            if codes:
+                fout.write(separator.join('' if value is None else str(value) for value in row))
+            else:
+                fout.write(separator.join('' if value is None else 'v{}'.format(value) for value in row))
+            fout.write('\n')
+            n_rows += 1
+    return n_rows
+
+
+def recovered(planted, fds, n_atts):
+    '''
+    Planted FDs implied by the discovered ones
+    returns (recovered, missed) lists of [lhs, [rhs]]
+    '''
+    index = ClosureIndex(fds, n_atts)
+    hits, misses = [], []
+    for lhs, rhss in planted:
+        (hits if all(index.implies(lhs, rhs) for rhs in rhss) else misses).append([lhs, rhss])
+    return hits, misses
@@ -0,0 +1,251 @@
+'''
+Asyncio runner of discovery jobs for asynchronous services
+
+Each job runs HyFd in a process of a pool of at most max_jobs processes
+that are replaced after every job, so the memory of a job is given back
+to the system as soon as it finishes. Jobs send their events (progress
+of each phase and level, FDs after each iteration, end of the job) to a
+queue of a multiprocessing Manager, read by a thread of the event loop
+that updates the jobs and their subscribers. Cancelling sets an Event of
+the Manager checked by the cancellation token of the job.
+
+With a cache directory, jobs share the result cache and the encoded
+columns of the databases (see hyfd_libs/cache.py), so a dataset
+submitted again is not read and encoded again.
+'''
+import asyncio
+import logging
+import itertools
+import traceback
+import multiprocessing
+
+from hyfd_libs.progress import CancellationToken, Cancelled
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+FINISHED = 'finished'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+DONE = (FINISHED, CANCELLED, FAILED)
+
+
+def sorted_fds(miner):
+    return [[sorted(lhs), sorted(rhss)] for lhs, rhss in miner.get_fds()]
+
+
+def run_job(miner, args, job_id, events, cancel):
+    '''
+    Runs in a process of the pool: discovers the FDs of args['db_path'],
+    putting (job_id, event) in events, the last event ends the job
+    '''
+    def put(event_type, **event):
+        event['type'] = event_type
+        events.put((job_id, event))
+    token = CancellationToken(cancel)
+    if token.cancelled:
+        put(CANCELLED, fds=None)
+        return
+    put(RUNNING)
+    args = dict(args)
+    args['progress'] = lambda event: put('progress', **event)
+    args['cancel'] = token
+    args['iteration'] = lambda iteration, hyfd: put('iteration', iteration=iteration, n_fds=hyfd.fds.n_fds, fds=sorted_fds(hyfd))
+    try:
+        hyfd = miner(**args)
+    except Cancelled:
+        # CANCELLED WHILE READING THE DATABASE
+        put(CANCELLED, fds=None)
+        return
+    except Exception:
+        put(FAILED, error=traceback.format_exc())
+        return
+    fds = sorted_fds(hyfd) if hyfd.fds is not None else None
+    put(CANCELLED if token.cancelled else FINISHED, fds=fds, execution_time=hyfd.execution_time)
+
+
+class Job(object):
+    '''
+    State of a job in the runner
+    '''
+    def __init__(self, job_id, args, cancel, loop):
+        self.id = job_id
+        self.args = args
+        self.cancel = cancel
+        self.state = QUEUED
+        self.last_event = None
+        self.iteration = 0
+        self.fds = None
+        self.error = None
+        self.execution_time = None
+        self.done = loop.create_future()
+        self.subscribers = []
+
+    def describe(self):
+        return {
+            'id': self.id,
+            'db_path': self.args['db_path'],
+            'state': self.state,
+            'iteration': self.iteration,
+            'n_fds': sum(len(rhss) for _, rhss in self.fds) if self.fds is not None else None,
+            'progress': self.last_event,
+            'execution_time': self.execution_time,
+            'error': self.error,
+        }
+
+
+class JobRunner(object):
+    '''
+    Runs discovery jobs from asyncio code.
+    miner -- picklable callable building a HyFd from keyword arguments
+    defaults -- dictionary with the default arguments of the miner
+    max_jobs -- maximum number of jobs running at the same time
+    cache -- directory of the result and encoding cache shared by the jobs
+    '''
+    def __init__(self, miner, defaults, max_jobs=2, cache=None):
+        self.miner = miner
+        self.defaults = dict(defaults)
+        if cache is not None:
+            self.defaults['cache'] = cache
+        self.jobs = {}
+        self.ids = itertools.count(1)
+        # FRESH PROCESSES, A FORKED CHILD WOULD INHERIT THE THREADS OF THE LOOP
+        self.manager = multiprocessing.get_context('spawn').Manager()
+        self.events = self.manager.Queue()
+        self.pool = multiprocessing.get_context('spawn').Pool(max_jobs, maxtasksperchild=1)
+        self.loop = None
+        self.reader = None
+
+    def _start(self):
+        if self.reader is None:
+            self.loop = asyncio.get_event_loop()
+            self.reader = self.loop.run_in_executor(None, self._read_events)
+
+    def _read_events(self):
+        '''
+        Runs in a thread: hands the events of the jobs to the loop until close
+        '''
+        while True:
+            job_id, event = self.events.get()
+            if job_id is None:
+                return
+            self.loop.call_soon_threadsafe(self._dispatch, job_id, event)
+
+    def _dispatch(self, job_id, event):
+        job = self.jobs.get(job_id, None)
+        if job is None:
+            return
+        event_type = event['type']
+        if event_type == 'progress':
+            job.last_event = event
+        elif event_type == 'iteration':
+            job.iteration = event['iteration']
+            job.fds = event['fds']
+        elif event_type == RUNNING:
+            job.state = RUNNING
+        elif event_type == FAILED:
+            job.state = FAILED
+            job.error = event['error']
+            logger.info("Job {} failed: {}".format(job_id, job.error))
+        elif event_type in (FINISHED, CANCELLED):
+            job.state = event_type
+            if event['fds'] is not None:
+                job.fds = event['fds']
+            job.execution_time = event.get('execution_time', None)
+        for queue in job.subscribers:
+            queue.put_nowait(event)
+        if job.state in DONE and not job.done.done():
+            job.done.set_result(job.state)
+
+    def _job(self, job_id):
+        if job_id not in self.jobs:
+            raise KeyError('Unknown job {}'.format(job_id))
+        return self.jobs[job_id]
+
+    def submit(self, db_path, **kwargs):
+        '''
+        Queues the discovery of the FDs of db_path, kwargs override the defaults
+        returns the id of the job
+        '''
+        self._start()
+        job_id = next(self.ids)
+        args = dict(self.defaults)
+        args.update(kwargs)
+        args['db_path'] = db_path
+        job = Job(job_id, args, self.manager.Event(), self.loop)
+        self.jobs[job_id] = job
+        self.pool.apply_async(run_job, (self.miner, args, job_id, self.events, job.cancel), error_callback=lambda e: self.events.put((job_id, {'type': FAILED, 'error': repr(e)})))
+        return job_id
+
+    def status(self, job_id):
+        '''
+        returns a dictionary with the state, the last progress event and the number of FDs of the job
+        '''
+        return self._job(job_id).describe()
+
+    async def result(self, job_id):
+        '''
+        Waits for the job to end
+        returns the list of [lhs, rhss] of its FDs
+        raises Cancelled or RuntimeError if it was cancelled or failed
+        '''
+        job = self._job(job_id)
+        state = await asyncio.shield(job.done)
+        if state == CANCELLED:
+            raise Cancelled()
+        if state == FAILED:
+            raise RuntimeError('Job {} failed: {}'.format(job_id, job.error))
+        return job.fds
+
+    def cancel(self, job_id):
+        '''
+        Stops the job, a queued job ends when the pool would start it.
+        The FDs of the iterations already done stay in the job.
+        '''
+        job = self._job(job_id)
+        if job.state not in DONE:
+            job.cancel.set()
+
+    async def stream(self, job_id):
+        '''
+        Yields the events of the job from now until it ends: dictionaries
+        with a type, progress ones as in hyfd_libs/progress.py, iteration
+        ones with the iteration, n_fds and fds, and a last one whose type
+        is the final state of the job
+        '''
+        job = self._job(job_id)
+        if job.state in DONE:
+            return
+        queue = asyncio.Queue()
+        job.subscribers.append(queue)
+        try:
+            while True:
+                event = await queue.get()
+                yield event
+                if event['type'] in DONE:
+                    return
+        finally:
+            job.subscribers.remove(queue)
+
+    def forget(self, job_id):
+        '''
+        Drops an ended job and its FDs from the runner
+        '''
+        if self._job(job_id).state not in DONE:
+            raise ValueError('Job {} has not ended'.format(job_id))
+        del self.jobs[job_id]
+
+    async def close(self):
+        '''
+        Cancels the jobs that did not end and stops the pool
+        '''
+        for job in self.jobs.values():
+            if job.state not in DONE:
+                job.cancel.set()
+        self.pool.close()
+        await self.loop.run_in_executor(None, self.pool.join)
+        if self.reader is not None:
+            self.events.put((None, None))
+            await self.reader
+        self.manager.shutdown()
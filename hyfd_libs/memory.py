@@ -0,0 +1,94 @@
+'''
+Memory accounting of the data structures of HyFd
+
+At each phase boundary the approximate size of the records, the PLIs,
+pli_records, the negative cover (BooleanTree) and the FDTree is computed
+by walking the objects reachable from each one of them, and the peak of
+each structure is kept. Arrays count their buffer, memory-mapped views
+only count the view, so the out-of-core mode reports what is in memory.
+
+In tracemalloc mode the memory traced by the interpreter is sampled
+at the same boundaries and the allocation sites holding most memory
+are logged at the end of the run.
+'''
+import sys
+import logging
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+STRUCTURES = ['records', 'plis', 'pli_records', 'non_fds', 'fds']
+ATOMIC = (str, bytes, int, float, bool, type(None), memoryview)
+TOP_ALLOCATIONS = 10
+
+
+def deep_size(obj):
+    '''
+    Approximate size in bytes of obj and the objects reachable from it,
+    each object counted once
+    '''
+    seen = set()
+    size = 0
+    stack = [obj]
+    while bool(stack):
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        if isinstance(current, ATOMIC) or hasattr(current, 'buffer_info'):
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        if hasattr(current, '__dict__'):
+            stack.append(current.__dict__)
+        for slot in getattr(type(current), '__slots__', ()):
+            if hasattr(current, slot):
+                stack.append(getattr(current, slot))
+    return size
+
+
+class MemoryAccounting(object):
+    '''
+    Samples the size of the structures of a HyFd instance.
+    mode -- 'sizes' or 'tracemalloc'
+    '''
+    def __init__(self, mode='sizes'):
+        self.mode = mode
+        self.peaks = dict((structure, 0) for structure in STRUCTURES)
+        self.traced_peak = 0
+        if self.mode == 'tracemalloc' and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def sample(self, miner, phase):
+        '''
+        Measures the structures of miner at the end of phase
+        returns {structure: bytes}
+        '''
+        sizes = {}
+        for structure in STRUCTURES:
+            obj = getattr(miner, structure, None)
+            sizes[structure] = deep_size(obj) if obj is not None else 0
+            self.peaks[structure] = max(self.peaks[structure], sizes[structure])
+        line = ' | '.join('{}:{}'.format(structure, sizes[structure]) for structure in STRUCTURES)
+        if self.mode == 'tracemalloc':
+            current, peak = tracemalloc.get_traced_memory()
+            self.traced_peak = max(self.traced_peak, peak)
+            line += ' | traced:{} | traced_peak:{}'.format(current, peak)
+        logger.info("Memory after {}: {}".format(phase, line))
+        return sizes
+
+    def report(self):
+        '''
+        Logs the peaks and, in tracemalloc mode, the top allocation sites
+        returns the peaks in the order of STRUCTURES and the traced peak ('' if not traced)
+        '''
+        logger.info("Memory peaks: {}".format(' | '.join('{}:{}'.format(structure, self.peaks[structure]) for structure in STRUCTURES)))
+        if self.mode == 'tracemalloc':
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, __file__)])
+            for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+                logger.info("Memory allocated at {}".format(stat))
+        return [self.peaks[structure] for structure in STRUCTURES] + [self.traced_peak if self.mode == 'tracemalloc' else '']
@@ -0,0 +1,87 @@
+'''
+Column-wise preprocessing over a pool of processes
+
+The codes of all columns are copied once into a shared array, column
+after column, and each worker partitions whole columns, writing the row
+ids and cluster offsets of their PLIs straight into two other shared
+arrays. Only the column index and the sizes of its PLI travel through
+the pool, so nothing proportional to the data is pickled.
+'''
+import multiprocessing
+from array import array
+
+from hyfd_libs.pli import PLI
+
+_SHARED = {}
+
+
+def partition(codes):
+    '''
+    Stripped partition of a column as CSR arrays, clusters ordered as in build_pli
+    returns (rows, offsets)
+    '''
+    hashes = {}
+    for i, code in enumerate(codes):
+        hashes.setdefault(code, []).append(i)
+    rows = array('i')
+    offsets = array('i', [0])
+    for cluster in sorted((c for c in hashes.values() if len(c) > 1), key=len, reverse=True):
+        rows.extend(cluster)
+        offsets.append(len(rows))
+    return rows, offsets
+
+
+def _view(raw):
+    return memoryview(raw).cast('B').cast('i')
+
+
+def _init(codes, rows, offsets, nrecs):
+    _SHARED['codes'] = _view(codes)
+    _SHARED['rows'] = _view(rows)
+    _SHARED['offsets'] = _view(offsets)
+    _SHARED['nrecs'] = nrecs
+
+
+def _partition_column(att):
+    nrecs = _SHARED['nrecs']
+    stride = nrecs // 2 + 2
+    rows, offsets = partition(_SHARED['codes'][att*nrecs:(att+1)*nrecs])
+    _SHARED['rows'][att*nrecs:att*nrecs+len(rows)] = rows
+    _SHARED['offsets'][att*stride:att*stride+len(offsets)] = offsets
+    return att, len(rows), len(offsets)
+
+
+def build_plis(columns, nrecs, jobs=1):
+    '''
+    PLIs of the columns, columns[i] holding one code per row for attribute i.
+    With jobs > 1 the columns are partitioned concurrently by jobs processes.
+    '''
+    if jobs <= 1 or len(columns) <= 1:
+        return [PLI.from_arrays(att, rows, offsets, nrecs) for att, (rows, offsets) in enumerate(map(partition, columns))]
+
+    natts = len(columns)
+    # A COLUMN HAS AT MOST nrecs//2 NON-SINGLETON CLUSTERS
+    stride = nrecs // 2 + 2
+    codes = multiprocessing.RawArray('i', natts * nrecs)
+    shared_rows = multiprocessing.RawArray('i', natts * nrecs)
+    shared_offsets = multiprocessing.RawArray('i', natts * stride)
+    codes_view = _view(codes)
+    for att, column in enumerate(columns):
+        codes_view[att*nrecs:(att+1)*nrecs] = column if isinstance(column, array) and column.typecode == 'i' else array('i', column)
+    codes_view.release()
+
+    plis = [None] * natts
+    pool = multiprocessing.Pool(min(jobs, natts), initializer=_init, initargs=(codes, shared_rows, shared_offsets, nrecs))
+    try:
+        rows_view, offsets_view = _view(shared_rows), _view(shared_offsets)
+        for att, size, n_offsets in pool.imap_unordered(_partition_column, range(natts)):
+            rows, offsets = array('i'), array('i')
+            rows.frombytes(rows_view[att*nrecs:att*nrecs+size].cast('B'))
+            offsets.frombytes(offsets_view[att*stride:att*stride+n_offsets].cast('B'))
+            plis[att] = PLI.from_arrays(att, rows, offsets, nrecs)
+        rows_view.release()
+        offsets_view.release()
+    finally:
+        pool.close()
+        pool.join()
+    return plis
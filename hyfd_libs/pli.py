@@ -1,22 +1,115 @@
+from array import array
 
 def ppli(pli, el_map=lambda s:chr(97+s)):
     # print (pli, [''.join(str(i) for i in part) for part in pli]  )
     return '|'.join(['.'.join(el_map(i) for i in part) for part in pli])
 
 class PLI(object):
+    '''
+    Stripped partition stored in compressed sparse row form:
+    rows holds the row ids of all clusters one after the other and
+    offsets[i] is the position in rows where cluster i starts,
+    offsets[len(self)] == len(rows).
+    '''
     _nrecs=None
-    def __init__(self, att, partition):
+    def __init__(self, att, partition, nrecs=None):
+        '''
+        att -- attribute id
+        partition -- list of clusters, each one a sorted list of row ids
+        '''
+        rows = array('i')
+        offsets = array('i', [0])
+        for cluster in partition:
+            rows.extend(cluster)
+            offsets.append(len(rows))
+        self._set_arrays(att, rows, offsets, nrecs)
+    @classmethod
+    def from_arrays(cls, att, rows, offsets, nrecs=None):
+        pli = cls.__new__(cls)
+        pli._set_arrays(att, rows, offsets, nrecs)
+        return pli
+    def _set_arrays(self, att, rows, offsets, nrecs):
         self.att = att
-        self.partition = partition
+        self.rows = rows
+        self.offsets = offsets
+        self.nrecs = nrecs
+        self.size = len(rows)
+        self._len = len(offsets) - 1
     def __repr__(self):
-        return ppli(self.partition, el_map=str)
+        return ppli(self, el_map=str)
     def __len__(self):
-        return len(self.partition)
+        return self._len
     def __iter__(self):
-        for i in self.partition:
-            yield i
+        rows, offsets = self.rows, self.offsets
+        for i in range(self._len):
+            yield rows[offsets[i]:offsets[i+1]]
     def __getitem__(self, arg):
-        return self.partition[arg]
+        return self.rows[self.offsets[arg]:self.offsets[arg+1]]
+    def sort_clusters(self, key):
+        rows, offsets = self.rows, self.offsets
+        for i in range(self._len):
+            a, b = offsets[i], offsets[i+1]
+            rows[a:b] = array('i', sorted(rows[a:b], key=key))
+    def cluster_sizes(self):
+        offsets = self.offsets
+        for i in range(self._len):
+            yield offsets[i+1] - offsets[i]
+    def histogram(self):
+        '''
+        Number of clusters of each size
+        returns {size: n_clusters}
+        '''
+        hist = {}
+        for size in self.cluster_sizes():
+            hist[size] = hist.get(size, 0) + 1
+        return hist
+    def probe_table(self, nrecs=None):
+        '''
+        Cluster id of each row, -1 for rows in stripped singletons
+        '''
+        table = array('i', [-1]) * (nrecs if nrecs is not None else self.n_recs)
+        rows, offsets = self.rows, self.offsets
+        for i in range(self._len):
+            for j in range(offsets[i], offsets[i+1]):
+                table[rows[j]] = i
+        return table
+    def intersect(self, probe, att=None):
+        '''
+        Intersection of this partition with another one given as a PLI
+        or as its probe table (a column of pli_records).
+        Clusters of the result keep the order of the rows in this partition.
+        '''
+        if isinstance(probe, PLI):
+            probe = probe.probe_table(self.n_recs)
+        rows, offsets = self.rows, self.offsets
+        new_rows = array('i')
+        new_offsets = array('i', [0])
+        for i in range(self._len):
+            groups = {}
+            for j in range(offsets[i], offsets[i+1]):
+                cid = probe[rows[j]]
+                if cid >= 0:
+                    groups.setdefault(cid, []).append(rows[j])
+            for group in groups.values():
+                if len(group) > 1:
+                    new_rows.extend(group)
+                    new_offsets.append(len(new_rows))
+        return PLI.from_arrays(att, new_rows, new_offsets, self.nrecs)
+    @property
+    def n_recs(self):
+        return self.nrecs if self.nrecs is not None else PLI._nrecs
     @property
     def number_of_parts(self):
-        return len(self.partition)+(PLI._nrecs - sum([len(i) for i in self.partition]))
\ No newline at end of file
+        return self._len + (self.n_recs - self.size)
+
+def build_pli(lst):
+    '''
+    Generates a PLI (position list indexes) given a column in the database (lst) (partition)
+    Example:
+    [0,1,0,1,1,2] -> [[1,3,4], [0,2]]
+    PLIs are ordered by number of indices in each component and filtered of singletons
+    '''
+    hashes = {}
+    for i, j in enumerate(lst):
+        hashes.setdefault(j, set([])).add(i)
+    return sorted([sorted(i) for i in hashes.values() if len(i) > 1], key = lambda k: len(k), reverse=True)
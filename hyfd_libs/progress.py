@@ -0,0 +1,120 @@
+'''
+Progress events and cooperative cancellation for long runs of HyFd
+
+The main loops of HyFd call ProgressReporter.update once per unit of
+work (a node of the FDTree, a non-FD, a window run). The call only
+compares the clock against the time of the next event, so that events
+are emitted at most once every interval seconds, and checks the
+cancellation token at the same moments.
+'''
+import time
+import threading
+
+
+class Cancelled(Exception):
+    '''
+    Raised inside HyFd when its cancellation token is set
+    '''
+    pass
+
+
+class CancellationToken(object):
+    '''
+    Thread-safe flag shared between HyFd and whoever wants to stop it.
+    event -- any object with set and is_set, e.g. the Event of a
+    multiprocessing Manager to cancel HyFd in another process
+    '''
+    def __init__(self, event=None):
+        self._event = event if event is not None else threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled()
+
+
+class ProgressReporter(object):
+    '''
+    callback -- called with a dictionary for each event, with keys
+    phase, level, done, total, n_fds, n_non_fds, elapsed and eta (seconds,
+    None when the total of the phase is unknown)
+    token -- CancellationToken checked when events are due
+    counts -- callable returning (n_fds, n_non_fds), only called for events
+    interval -- minimum number of seconds between two events
+    '''
+    def __init__(self, callback=None, token=None, counts=None, interval=0.5):
+        self.callback = callback
+        self.token = token
+        self.counts = counts
+        self.interval = interval
+        self.t0 = time.time()
+        self.phase = None
+        self.level = None
+        self.total = None
+        self.done = 0
+        self._emitted = 0
+        self._phase_t0 = self.t0
+        self._next = self.t0
+
+    def start(self, phase, total=None, level=None):
+        '''
+        Starts a phase with total units of work
+        '''
+        self.phase = phase
+        self.total = total
+        self.level = level
+        self.done = 0
+        self._emitted = 0
+        self._phase_t0 = time.time()
+        self.check()
+
+    def update(self, done):
+        self.done = done
+        now = time.time()
+        if now < self._next:
+            return
+        self._next = now + self.interval
+        self._emitted = done
+        if self.callback is not None:
+            self.callback(self.event(now))
+        if self.token is not None:
+            self.token.check()
+
+    def finish(self):
+        '''
+        Emits the final event of the phase regardless of the interval,
+        unless the phase was empty or its last event already says it
+        '''
+        done = self.total if self.total is not None else self.done
+        if done == 0 or done == self._emitted:
+            self.check()
+            return
+        self._next = 0
+        self.update(done)
+
+    def check(self):
+        if self.token is not None:
+            self.token.check()
+
+    def event(self, now=None):
+        now = now if now is not None else time.time()
+        n_fds, n_non_fds = self.counts() if self.counts is not None else (None, None)
+        eta = None
+        if self.total is not None and self.done > 0:
+            eta = (now - self._phase_t0) / self.done * (self.total - self.done)
+        return {
+            'phase': self.phase,
+            'level': self.level,
+            'done': self.done,
+            'total': self.total,
+            'n_fds': n_fds,
+            'n_non_fds': n_non_fds,
+            'elapsed': now - self.t0,
+            'eta': eta,
+        }
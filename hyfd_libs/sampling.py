@@ -0,0 +1,121 @@
+'''
+Sampling of agree-sets over sorted-neighbourhood windows as described in [1]
+
+On skewed data a few huge clusters hold most pairs and windows reach few
+of them, so two more strategies share the efficiency queue: random pairs
+within large clusters, and the tuples named in comparison suggestions
+against random tuples of their clusters. Each strategy keeps its own
+Efficiency and the queue runs the one with the best yield.
+
+[1] Papenbrock et al - A Hybrid Approach to Functional Dependency Discovery (2016)
+'''
+from hyfd_libs.efficiency import LARGE_CLUSTER, FOCUS_ROUNDS
+
+WINDOW = 'window'
+RANDOM = 'random'
+FOCUSED = 'focused'
+STRATEGIES = (WINDOW, RANDOM, FOCUSED)
+
+def run_strategy(efficiency, plis, pli_records, non_fds, targets=None):
+    '''
+    Runs the sampling strategy of efficiency once more
+    returns the number of comparisons
+    '''
+    efficiency.window += 1
+    if efficiency.strategy == RANDOM:
+        return run_random(efficiency, plis[efficiency.att], pli_records, non_fds, targets)
+    if efficiency.strategy == FOCUSED:
+        return run_focused(efficiency, plis, pli_records, non_fds, targets)
+    return run_window(efficiency, plis[efficiency.att], pli_records, non_fds, targets)
+
+def run_window(efficiency, pli, pli_records, non_fds, targets=None):
+    '''
+    Compares the tuples at distance window in the clusters of pli,
+    agree-sets that agree on all targets (all attributes if None) are not kept
+    '''
+    # logger.debug("\tRUN:{} window::{}".format(pli,efficiency.window ))
+    # print ("\tRUN:", pli, 'window::',efficiency.window )
+    n_rows = 0
+    prev_num_non_fds = len(non_fds)
+    for cluster in pli:
+        # print ('\t\t:: CLUSTER:',cluster, '|', range(len(cluster)-efficiency.window+1))
+        for i in range(len(cluster)-efficiency.window+1):
+            # logger.debug('\t\t Comparing tuples {} - {}'.format(cluster[i],cluster[i+efficiency.window-1]))
+            # # print ('\t\t\t->',)
+            n_rows += 1 # Add row reading
+            pivot = pli_records[cluster[i]]
+            partner = pli_records[cluster[i+efficiency.window-1]]
+            efficiency.increase_comps()
+            # TARGETS ARE CHECKED BEFORE MATCHING THE WHOLE RECORDS
+            if targets is not None and all(pivot[t] == partner[t] and pivot[t] > -1 for t in targets):
+                continue
+            compare = match(pivot, partner)
+            # logger.debug('\t\t\tResult:{} || New?:{}'.format( compare, compare not in non_fds))
+            if not all(compare):
+                non_fds.append(compare)
+    efficiency.results += len(non_fds) - prev_num_non_fds
+    return n_rows
+
+def compare(efficiency, pivot, partner, non_fds, targets=None):
+    efficiency.increase_comps()
+    if targets is not None and all(pivot[t] == partner[t] and pivot[t] > -1 for t in targets):
+        return
+    agree_set = match(pivot, partner)
+    if not all(agree_set):
+        non_fds.append(agree_set)
+
+def run_random(efficiency, pli, pli_records, non_fds, targets=None):
+    '''
+    Compares LARGE_CLUSTER random pairs of tuples in each large cluster of pli
+    '''
+    n_rows = 0
+    prev_num_non_fds = len(non_fds)
+    rows, offsets, rng = pli.rows, pli.offsets, efficiency.rng
+    for ci in efficiency.clusters:
+        start, size = offsets[ci], offsets[ci+1] - offsets[ci]
+        for _ in range(LARGE_CLUSTER):
+            i = rng.randrange(size)
+            j = rng.randrange(size - 1)
+            j += j >= i
+            n_rows += 1
+            compare(efficiency, pli_records[rows[start+i]], pli_records[rows[start+j]], non_fds, targets)
+            if efficiency.done:
+                break
+        if efficiency.done:
+            break
+    efficiency.results += len(non_fds) - prev_num_non_fds
+    return n_rows
+
+def run_focused(efficiency, plis, pli_records, non_fds, targets=None):
+    '''
+    Compares each tuple of efficiency with a random tuple of each of its clusters
+    '''
+    n_rows = 0
+    prev_num_non_fds = len(non_fds)
+    rng = efficiency.rng
+    for ri in efficiency.rows:
+        pivot = pli_records[ri]
+        for x, cluster in enumerate(pivot):
+            if cluster < 0:
+                continue
+            start, end = plis[x].offsets[cluster], plis[x].offsets[cluster+1]
+            rj = plis[x].rows[rng.randrange(start, end)]
+            if rj == ri:
+                continue
+            n_rows += 1
+            compare(efficiency, pivot, pli_records[rj], non_fds, targets)
+    if efficiency.window >= FOCUS_ROUNDS:
+        efficiency.done = True
+    efficiency.results += len(non_fds) - prev_num_non_fds
+    return n_rows
+
+def relevant(agree_set, targets=None):
+    '''
+    True if the agree-set disagrees on some target attribute, i.e. it is a non-FD for a target
+    '''
+    if targets is None:
+        return not all(agree_set)
+    return not all(agree_set[t] for t in targets)
+
+def match(row1, row2):
+    return tuple([i==j and i>-1 for i, j in zip(row1, row2)])
@@ -0,0 +1,276 @@
+'''
+Query server keeping encoded databases and discovered covers in memory
+
+Clients talk to the server over a Unix socket with the length-prefixed
+JSON messages of the distributed mode, one request and one answer per
+message. A request is a dictionary with an 'op' and its arguments,
+an answer is a dictionary, with an 'error' entry if the request failed.
+
+Datasets are kept in least-recently-used order and evicted when their
+estimated size goes over the memory cap of the server.
+'''
+import os
+import socket
+import logging
+import threading
+from collections import OrderedDict
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+from hyfd_libs.closure import ClosureIndex, to_atts
+from hyfd_libs.distributed import send_msg, recv_msg
+from hyfd_libs.memory import deep_size, STRUCTURES
+
+logger = logging.getLogger(__name__)
+
+SOCKET_PATH = './hyfd.sock'
+
+
+def dataset_size(miner=None, index=None):
+    '''
+    Estimated size in bytes of the structures and cover of a dataset
+    '''
+    size = 0
+    if miner is not None:
+        size += sum(deep_size(getattr(miner, structure)) for structure in STRUCTURES if getattr(miner, structure) is not None)
+    if index is not None:
+        size += deep_size(index)
+    return size
+
+
+class Dataset(object):
+    '''
+    A database encoded by a miner (HyFd) and/or a cover of FDs
+    '''
+    def __init__(self, name, miner=None, index=None):
+        self.name = name
+        self.miner = miner
+        self._index = index
+        self.lock = threading.Lock()
+        self.size = dataset_size(miner, index)
+
+    @property
+    def discovered(self):
+        return self._index is not None or (self.miner is not None and self.miner.fds is not None)
+
+    @property
+    def index(self):
+        if self._index is None:
+            if not self.discovered:
+                raise ValueError('No FDs discovered for {}, run discover first'.format(self.name))
+            self._index = self.miner.closure_index()
+            self.size = dataset_size(self.miner, self._index)
+        return self._index
+
+    def describe(self):
+        return {
+            'name': self.name,
+            'nrecs': self.miner.nrecs if self.miner is not None else None,
+            'natts': self.miner.natts if self.miner is not None else self._index.n_atts,
+            'discovered': self.discovered,
+            'size': self.size,
+        }
+
+
+class QueryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    '''
+    Serves queries over the datasets it holds.
+    miner -- callable building a HyFd from an argparse Namespace,
+    called with discover=False to only encode the database
+    defaults -- dictionary with the default arguments of the miner
+    memory_cap -- bytes that datasets may take before the oldest are evicted
+    '''
+    daemon_threads = True
+
+    def __init__(self, path, miner, defaults, memory_cap=None):
+        if os.path.exists(path):
+            os.remove(path)
+        socketserver.UnixStreamServer.__init__(self, path, QueryHandler)
+        self.path = path
+        self.miner = miner
+        self.defaults = defaults
+        self.memory_cap = memory_cap
+        self.datasets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def get(self, name):
+        with self.lock:
+            if name not in self.datasets:
+                raise KeyError('Unknown dataset {}'.format(name))
+            dataset = self.datasets.pop(name)
+            self.datasets[name] = dataset
+        return dataset
+
+    def put(self, dataset):
+        '''
+        Registers the dataset and evicts the least recently used ones over the cap
+        '''
+        with self.lock:
+            self.datasets.pop(dataset.name, None)
+            self.datasets[dataset.name] = dataset
+            self._evict()
+            if dataset.name not in self.datasets:
+                raise MemoryError('Dataset {} ({} bytes) does not fit in the memory cap'.format(dataset.name, dataset.size))
+
+    def _evict(self):
+        if self.memory_cap is None:
+            return
+        total = sum(dataset.size for dataset in self.datasets.values())
+        while total > self.memory_cap and bool(self.datasets):
+            name, dataset = self.datasets.popitem(last=False)
+            total -= dataset.size
+            logger.info("Evicted {} ({} bytes)".format(name, dataset.size))
+
+    def handle_request_msg(self, msg):
+        op = msg.get('op', None)
+        handler = getattr(self, 'op_{}'.format(op), None)
+        if handler is None:
+            raise ValueError('Unknown op {}'.format(op))
+        return handler(msg)
+
+    def op_load(self, msg):
+        '''
+        Encodes the database in db_path and runs discovery unless discover is false
+        '''
+        args = dict(self.defaults)
+        args.update((k, v) for k, v in msg.items() if k in args)
+        args['db_path'] = msg['db_path']
+        args['discover'] = msg.get('discover', True)
+        dataset = Dataset(msg['name'], miner=self.miner(**args))
+        self.put(dataset)
+        return dataset.describe()
+
+    def op_load_cover(self, msg):
+        '''
+        Loads the FDs in a JSON file written by HyFd
+        '''
+        dataset = Dataset(msg['name'], index=ClosureIndex.from_json(msg['path'], msg.get('n_atts', None)))
+        self.put(dataset)
+        return dataset.describe()
+
+    def op_discover(self, msg):
+        dataset = self.get(msg['name'])
+        if dataset.miner is None:
+            raise ValueError('Dataset {} holds no records'.format(dataset.name))
+        with dataset.lock:
+            if dataset.miner.fds is None:
+                dataset.miner.execute()
+            index = dataset.index
+        with self.lock:
+            self._evict()
+        return {'n_fds': sum(len(to_atts(rhs)) for rhs in index.rhss)}
+
+    def op_fds(self, msg):
+        '''
+        FDs of the cover, only those with column in the right hand side if given
+        '''
+        index = self.get(msg['name']).index
+        column = msg.get('column', None)
+        fds = []
+        for lhs, rhs in zip(index.lhss, index.rhss):
+            if column is None:
+                fds.append([to_atts(lhs), to_atts(rhs)])
+            elif rhs >> column & 1:
+                fds.append([to_atts(lhs), [column]])
+        if index.base and (column is None or index.base >> column & 1):
+            fds.append([[], to_atts(index.base) if column is None else [column]])
+        return {'fds': fds}
+
+    def op_closure(self, msg):
+        return {'closure': self.get(msg['name']).index.closure(msg['atts'])}
+
+    def op_implies(self, msg):
+        return {'implies': self.get(msg['name']).index.implies(msg['lhs'], msg['rhs'])}
+
+    def op_keys(self, msg):
+        return {'keys': list(self.get(msg['name']).index.candidate_keys())}
+
+    def op_holds(self, msg):
+        '''
+        Checks lhs -> rhs on the records of the dataset
+        '''
+        dataset = self.get(msg['name'])
+        if dataset.miner is None:
+            raise ValueError('Dataset {} holds no records'.format(dataset.name))
+        with dataset.lock:
+            return {'holds': dataset.miner.holds(msg['lhs'], msg['rhs'])}
+
+    def op_list(self, msg):
+        with self.lock:
+            datasets = list(self.datasets.values())
+        return {'datasets': [dataset.describe() for dataset in datasets]}
+
+    def op_unload(self, msg):
+        with self.lock:
+            self.datasets.pop(msg['name'], None)
+        return {}
+
+    def op_shutdown(self, msg):
+        threading.Thread(target=self.shutdown).start()
+        return {}
+
+
+class QueryHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                msg = recv_msg(self.request)
+            except ConnectionError:
+                break
+            try:
+                answer = self.server.handle_request_msg(msg)
+            except Exception as e:
+                logger.debug("Request {} failed".format(msg), exc_info=True)
+                answer = {'error': '{}: {}'.format(type(e).__name__, e)}
+            send_msg(self.request, answer)
+
+
+class QueryClient(object):
+    '''
+    Client of a QueryServer, keeps the connection open between requests
+    '''
+    def __init__(self, path=SOCKET_PATH):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+
+    def request(self, op, **kwargs):
+        kwargs['op'] = op
+        send_msg(self.sock, kwargs)
+        answer = recv_msg(self.sock)
+        if 'error' in answer:
+            raise RuntimeError(answer['error'])
+        return answer
+
+    def load(self, name, db_path, **kwargs):
+        return self.request('load', name=name, db_path=db_path, **kwargs)
+
+    def load_cover(self, name, path, n_atts=None):
+        return self.request('load_cover', name=name, path=path, n_atts=n_atts)
+
+    def discover(self, name):
+        return self.request('discover', name=name)['n_fds']
+
+    def fds(self, name, column=None):
+        return self.request('fds', name=name, column=column)['fds']
+
+    def closure(self, name, atts):
+        return self.request('closure', name=name, atts=list(atts))['closure']
+
+    def implies(self, name, lhs, rhs):
+        return self.request('implies', name=name, lhs=list(lhs), rhs=rhs)['implies']
+
+    def holds(self, name, lhs, rhs):
+        return self.request('holds', name=name, lhs=list(lhs), rhs=rhs)['holds']
+
+    def keys(self, name):
+        return self.request('keys', name=name)['keys']
+
+    def close(self):
+        self.sock.close()
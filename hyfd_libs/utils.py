@@ -3,8 +3,11 @@ import json
 import datetime
 import time
 
+from hyfd_libs.fdfile import write_fds
+
 STAT_DIRECTORY = './results/'
 STAT_FILE = 'hyfd_results.txt'
+ROTATED_STAT_FNAME = '{}-{}.txt'
 
 class Stats(object):
     def __init__(self, logger, headers, restart=False):
@@ -18,8 +21,18 @@ class Stats(object):
                 self.logger.error("Director does not exists: {}".format(STAT_DIRECTORY))
                 self.logger.error("EXITING: Could not create directory: {}".format(STAT_DIRECTORY))
                 exit()
-        if not os.path.isfile(STAT_DIRECTORY+STAT_FILE) or restart:
-            with open(STAT_DIRECTORY+STAT_FILE, 'w') as fout:
+        path = STAT_DIRECTORY+STAT_FILE
+        if os.path.isfile(path) and not restart:
+            with open(path, 'r') as fin:
+                header = fin.readline().replace('\n','').split('\t')
+            if header != self.headers:
+                # THE FILE HAS OTHER COLUMNS, IT IS KEPT APART AND A NEW ONE STARTED
+                st = datetime.datetime.fromtimestamp(time.time()).strftime('%Y%m%d%H%M%S')
+                rotated = STAT_DIRECTORY+ROTATED_STAT_FNAME.format(STAT_FILE[:STAT_FILE.rfind('.')], st)
+                os.rename(path, rotated)
+                self.logger.info("Results File with other columns moved to: {}".format(rotated))
+        if not os.path.isfile(path) or restart:
+            with open(path, 'w') as fout:
                 self.logger.info("Results File Initialized: {}".format(STAT_DIRECTORY+STAT_FILE))
                 fout.write('{}\n'.format('\t'.join(self.headers)))
 
@@ -29,10 +42,18 @@ class Stats(object):
 
 OUTPUT_DIRECTORY = './json/'
 OUTPUT_FNAME = '{}-{}.json'
+KEYS_FNAME = '{}-{}.keys.json'
+VERIFY_FNAME = '{}-{}.verify.json'
+DIFF_FNAME = '{}-{}.diff.json'
+BINARY_FNAME = '{}-{}.fds'
+COMPRESSION_EXTENSIONS = ('.gz', '.bz2', '.xz', '.zst')
 
 class Output(object):
-    def __init__(self, logger, db_path):
+    def __init__(self, logger, db_path, binary=False):
         self.logger = logger
+        for extension in COMPRESSION_EXTENSIONS:
+            if db_path.endswith(extension):
+                db_path = db_path[:-len(extension)]
         self.dbname = db_path[db_path.rfind('/')+1:db_path.rfind('.')]
         self.st = datetime.datetime.fromtimestamp(time.time()).strftime('%Y%m%d%H%M%S')
         
@@ -46,8 +67,35 @@ class Output(object):
                 self.logger.error("EXITING: Could not create directory: {}".format(OUTPUT_DIRECTORY))
                 exit()
         self.fout_path = OUTPUT_DIRECTORY+OUTPUT_FNAME.format(self.dbname, self.st)
+        self.keys_path = OUTPUT_DIRECTORY+KEYS_FNAME.format(self.dbname, self.st)
+        self.verify_path = OUTPUT_DIRECTORY+VERIFY_FNAME.format(self.dbname, self.st)
+        self.diff_path = OUTPUT_DIRECTORY+DIFF_FNAME.format(self.dbname, self.st)
+        self.binary_path = OUTPUT_DIRECTORY+BINARY_FNAME.format(self.dbname, self.st) if binary else None
 
-    def write(self, fds):
+    def write(self, fds, n_atts=None, metadata=None):
+        '''
+        Writes the FDs as JSON, and in the binary format of hyfd_libs/fdfile.py
+        if it was asked for and the number of attributes is given
+        '''
+        fds = list(fds)
         with open(self.fout_path, 'w') as fout:
-            json.dump(list(fds), fout)
-            self.logger.info("FDs written in: {}".format(self.fout_path))
\ No newline at end of file
+            json.dump(fds, fout)
+            self.logger.info("FDs written in: {}".format(self.fout_path))
+        if self.binary_path is not None and n_atts is not None:
+            write_fds(self.binary_path, fds, n_atts, metadata)
+            self.logger.info("FDs written in: {}".format(self.binary_path))
+
+    def write_keys(self, keys):
+        with open(self.keys_path, 'w') as fout:
+            json.dump(sorted(keys), fout)
+            self.logger.info("Keys written in: {}".format(self.keys_path))
+
+    def write_verification(self, results):
+        with open(self.verify_path, 'w') as fout:
+            json.dump([{'lhs': lhs, 'rhs': rhs, 'holds': witness is None, 'witness': list(witness) if witness is not None else None} for lhs, rhs, witness in results], fout)
+            self.logger.info("Verification written in: {}".format(self.verify_path))
+
+    def write_diff(self, added, removed):
+        with open(self.diff_path, 'w') as fout:
+            json.dump({'added': [[list(lhs), rhs] for lhs, rhs in sorted(added)], 'removed': [[list(lhs), rhs] for lhs, rhs in sorted(removed)]}, fout)
+            self.logger.info("Differences written in: {}".format(self.diff_path))
@@ -0,0 +1,72 @@
+'''
+Stripped partitions of left hand sides for checking given FDs
+
+The LHSs to check are known in advance and processed in sorted order,
+so the LHSs sharing a prefix come one after the other. refines scans the
+partition of the longest prefix available and stops at the first
+violation, which for an FD that does not hold is much cheaper than
+intersecting a partition. The partition of a prefix shared by several
+LHSs is only intersected, from the partition of the shorter prefix,
+once an FD below it held, i.e. once a whole partition had to be scanned,
+and it is kept while the next LHSs below it are checked.
+Attributes are kept in the order of the PLIs, the ones with the most
+clusters first, so the partitions of the prefixes are already small.
+'''
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionCache(object):
+    '''
+    Partitions of the shared prefixes of lhss (sorted tuples of PLI positions)
+    '''
+    def __init__(self, plis, nrecs, lhss):
+        self.plis = plis
+        self.nrecs = nrecs
+        self.probes = {}
+        counts = {}
+        for lhs in lhss:
+            for size in range(2, len(lhs)+1):
+                counts[lhs[:size]] = counts.get(lhs[:size], 0) + 1
+        self.shared = set(prefix for prefix, count in counts.items() if count > 1)
+        self.scanned = set()
+        # PARTITIONS OF THE PREFIXES OF THE LAST LHS, SHORTEST FIRST
+        self.stack = []
+        self.hits = 0
+
+    def probe(self, att):
+        '''
+        Cluster id of each row for attribute att
+        '''
+        if att not in self.probes:
+            self.probes[att] = self.plis[att].probe_table(self.nrecs)
+        return self.probes[att]
+
+    def get(self, lhs):
+        '''
+        Partition of the longest shared prefix of the non-empty LHS lhs,
+        the PLI of its first attribute if no prefix is shared
+        returns PLI
+        '''
+        while bool(self.stack) and lhs[:len(self.stack[-1][0])] != self.stack[-1][0]:
+            self.stack.pop()
+        partition = self.plis[lhs[0]]
+        if bool(self.stack):
+            self.hits += 1
+            partition = self.stack[-1][1]
+        for size in range(len(self.stack[-1][0])+1 if bool(self.stack) else 2, len(lhs)+1):
+            if lhs[:size] not in self.scanned:
+                break
+            partition = partition.intersect(self.probe(lhs[size-1]))
+            self.stack.append((lhs[:size], partition))
+        return partition
+
+    def held(self, lhs):
+        '''
+        Records that an FD with left hand side lhs held, the shared
+        prefixes of lhs are intersected for the next LHSs below them
+        '''
+        for size in range(2, len(lhs)+1):
+            if lhs[:size] in self.shared:
+                self.scanned.add(lhs[:size])
@@ -0,0 +1,48 @@
+"""
+FD query server.
+Keeps encoded databases and their discovered FDs in memory and answers
+queries over a Unix socket (see hyfd_libs/server.py and QueryClient)
+"""
+import logging
+import argparse
+from hyfd import HyFd, INVALID_FDS_THRESHOLD, EFFICIENCY_THRESHOLD_INIT, LEARNING_FACTOR, EFFICIENCY_LIMIT
+from hyfd_libs.server import QueryServer, SOCKET_PATH
+
+FORMAT = "[%(filename)s:%(lineno)s - %(funcName)20s() ] %(message)s"
+
+MINER_DEFAULTS = {
+    'separator': ',',
+    'ignore_headers': False,
+    'restart': False,
+    'keys': False,
+    'efft': EFFICIENCY_THRESHOLD_INIT,
+    'lf': LEARNING_FACTOR,
+    'ift': INVALID_FDS_THRESHOLD,
+    'el': EFFICIENCY_LIMIT,
+}
+
+def miner(**kwargs):
+    return HyFd(argparse.Namespace(**kwargs))
+
+if __name__ == "__main__":
+    __parser__ = argparse.ArgumentParser(description='HyFD Query Server')
+    __parser__.add_argument('-u', '--socket', metavar='path', type=str, help='Unix socket to listen on', default=SOCKET_PATH)
+    __parser__.add_argument('-c', '--memory-cap', metavar='MB', type=int, help='Evict datasets when they take more than MB megabytes', default=None)
+    __parser__.add_argument('-d', '--debug', help='Debug mode', action='store_true')
+    __parser__.add_argument('-m', '--mute', help='No Output', action='store_true')
+
+    args = __parser__.parse_args()
+    level = logging.DEBUG if args.debug else logging.INFO
+    if args.mute:
+        level = logging.CRITICAL
+    logging.basicConfig( level=level, format=FORMAT )
+
+    memory_cap = args.memory_cap << 20 if args.memory_cap is not None else None
+    server = QueryServer(args.socket, miner, MINER_DEFAULTS, memory_cap)
+    logging.info("Serving queries on {}".format(args.socket))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Exiting by command")
+    finally:
+        server.server_close()
@@ -0,0 +1,129 @@
+"""
+Parameter sweep for HyFd.
+The database is read and preprocessed once, then every combination of
+the given parameter values runs in a process forked from the
+preprocessed one, so all of them share the encoded data.
+Writes a table with the time of each phase, row checks and peak memory
+of every configuration and recommends the fastest one.
+"""
+import os
+import time
+import logging
+import argparse
+import datetime
+import resource
+import itertools
+import multiprocessing
+from hyfd import HyFd, INVALID_FDS_THRESHOLD, EFFICIENCY_THRESHOLD_INIT, LEARNING_FACTOR, EFFICIENCY_LIMIT
+from hyfd_libs.utils import STAT_DIRECTORY
+
+FORMAT = "[%(filename)s:%(lineno)s - %(funcName)20s() ] %(message)s"
+
+SWEEP_FNAME = '{}-{}.sweep.tsv'
+PARAMETERS = ['efft', 'lf', 'ift', 'el']
+COLUMNS = PARAMETERS + ['n_FDs', 'iterations', 'SamplingTime', 'InductionTime', 'ValidationTime', 'ExecTime', 'row_check', 'Memory']
+
+# PREPROCESSED MINER INHERITED BY THE FORKED PROCESSES
+_BASE = None
+
+
+def run_config(config):
+    '''
+    Runs the preprocessed miner with the parameters in config
+    returns the row of config in the sweep table
+    '''
+    miner = _BASE
+    miner.efficiency_threshold = config['efft']
+    miner.learning_factor = config['lf']
+    miner.invalid_fds_threshold = config['ift']
+    miner.efficiency_limit = config['el']
+    t0 = time.time()
+    iterations = 0
+    while miner.go_on:
+        miner.iterate()
+        iterations += 1
+    row = dict(config)
+    row.update({
+        'n_FDs': miner.fds.n_fds,
+        'iterations': iterations,
+        'SamplingTime': miner.phase_times['sampling'],
+        'InductionTime': miner.phase_times['induction'],
+        'ValidationTime': miner.phase_times['validation'],
+        'ExecTime': time.time()-t0,
+        'row_check': miner.row_checks,
+        'Memory': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    })
+    logging.info("Configuration {} done in {}s".format(config, round(row['ExecTime'], 3)))
+    return row
+
+
+def sweep(miner, grid, jobs=1):
+    '''
+    Runs every combination of the values in grid ({parameter: [values]})
+    over the preprocessed miner, jobs configurations at a time
+    returns the rows of the sweep table
+    '''
+    global _BASE
+    _BASE = miner
+    configs = [dict(zip(PARAMETERS, values)) for values in itertools.product(*[grid[p] for p in PARAMETERS])]
+    # ONE FRESH FORK PER CONFIGURATION, THE RUNS MODIFY THE MINER
+    pool = multiprocessing.get_context('fork').Pool(jobs, maxtasksperchild=1)
+    try:
+        return pool.map(run_config, configs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def write_table(path, rows):
+    with open(path, 'w') as fout:
+        fout.write('{}\n'.format('\t'.join(COLUMNS)))
+        for row in rows:
+            fout.write('{}\n'.format('\t'.join(str(row[c]) for c in COLUMNS)))
+
+
+def values(text):
+    return [float(v) for v in text.split(',')]
+
+
+if __name__ == "__main__":
+    __parser__ = argparse.ArgumentParser(description='HyFD Parameter Sweep')
+    __parser__.add_argument('db_path', metavar='db_path', type=str, help='path to the database')
+    __parser__.add_argument('-s', '--separator', metavar='separator', type=str, help='Value separator', default=",")
+    __parser__.add_argument('-i', '--ignore_headers', help='Ignore Headers', action='store_true')
+    __parser__.add_argument('-t', '--table', metavar='table', type=str, help='Table to read from an SQLite database', default=None)
+    __parser__.add_argument('-j', '--jobs', metavar='processes', type=int, help='Configurations run at the same time', default=1)
+    __parser__.add_argument('-d', '--debug', help='Debug mode', action='store_true')
+    __parser__.add_argument('-m', '--mute', help='No Output', action='store_true')
+    __parser__.add_argument('-efft', metavar='efficiency thresholds', type=values, default=[EFFICIENCY_THRESHOLD_INIT])
+    __parser__.add_argument('-lf', metavar='learning factors', type=values, default=[LEARNING_FACTOR])
+    __parser__.add_argument('-ift', metavar='invalid fds thresholds', type=values, default=[INVALID_FDS_THRESHOLD])
+    __parser__.add_argument('-el', metavar='efficiency limits', type=values, default=[EFFICIENCY_LIMIT])
+
+    args = __parser__.parse_args()
+    level = logging.DEBUG if args.debug else logging.INFO
+    if args.mute:
+        level = logging.CRITICAL
+    logging.basicConfig( level=level, format=FORMAT )
+
+    grid = dict((p, getattr(args, p)) for p in PARAMETERS)
+    miner_args = argparse.Namespace(
+        db_path=args.db_path, separator=args.separator, ignore_headers=args.ignore_headers, table=args.table,
+        restart=False, discover=False, efft=grid['efft'][0], lf=grid['lf'][0], ift=grid['ift'][0], el=grid['el'][0])
+    t0 = time.time()
+    miner = HyFd(miner_args)
+    logging.info("Read and preprocessed once in {}s".format(round(time.time()-t0, 3)))
+
+    rows = sweep(miner, grid, args.jobs)
+    if len(set(row['n_FDs'] for row in rows)) > 1:
+        logging.warning("Configurations found different numbers of FDs: {}".format(sorted(set(row['n_FDs'] for row in rows))))
+
+    st = datetime.datetime.fromtimestamp(time.time()).strftime('%Y%m%d%H%M%S')
+    if not os.path.isdir(STAT_DIRECTORY):
+        os.mkdir(STAT_DIRECTORY)
+    path = STAT_DIRECTORY + SWEEP_FNAME.format(miner.output.dbname, st)
+    write_table(path, rows)
+    logging.info("Sweep table written in: {}".format(path))
+
+    best = min(rows, key=lambda row: (row['ExecTime'], row['row_check']))
+    print('Fastest configuration: {} ({}s, {} row checks)'.format(' '.join('-{} {}'.format(p, best[p]) for p in PARAMETERS), round(best['ExecTime'], 3), best['row_check']))
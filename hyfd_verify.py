@@ -0,0 +1,52 @@
+"""
+Verification of a catalog of FDs.
+Checks every FD of a JSON file in the format written by HyFd
+against a database, without discovering anything, and writes for each
+one whether it holds and a pair of rows violating it if it does not.
+Exits with status 1 if some FD does not hold.
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+from hyfd import HyFd, INVALID_FDS_THRESHOLD, EFFICIENCY_THRESHOLD_INIT, LEARNING_FACTOR, EFFICIENCY_LIMIT
+
+FORMAT = "[%(filename)s:%(lineno)s - %(funcName)20s() ] %(message)s"
+
+
+if __name__ == "__main__":
+    __parser__ = argparse.ArgumentParser(description='HyFD Verification')
+    __parser__.add_argument('db_path', metavar='db_path', type=str, help='path to the database')
+    __parser__.add_argument('fds_path', metavar='fds_path', type=str, help='path to the JSON file with the FDs, [[lhs, rhss], ...]')
+    __parser__.add_argument('-s', '--separator', metavar='separator', type=str, help='Value separator', default=",")
+    __parser__.add_argument('-i', '--ignore_headers', help='Ignore Headers', action='store_true')
+    __parser__.add_argument('-t', '--table', metavar='table', type=str, help='Table to read from an SQLite database', default=None)
+    __parser__.add_argument('-j', '--jobs', metavar='processes', type=int, help='Processes used to build the PLIs', default=1)
+    __parser__.add_argument('-d', '--debug', help='Debug mode', action='store_true')
+    __parser__.add_argument('-m', '--mute', help='No Output', action='store_true')
+
+    args = __parser__.parse_args()
+    level = logging.DEBUG if args.debug else logging.INFO
+    if args.mute:
+        level = logging.CRITICAL
+    logging.basicConfig( level=level, format=FORMAT )
+
+    with open(args.fds_path, 'r') as fin:
+        fds = json.load(fin)
+
+    miner_args = argparse.Namespace(
+        db_path=args.db_path, separator=args.separator, ignore_headers=args.ignore_headers, table=args.table, jobs=args.jobs,
+        restart=False, discover=False, efft=EFFICIENCY_THRESHOLD_INIT, lf=LEARNING_FACTOR, ift=INVALID_FDS_THRESHOLD, el=EFFICIENCY_LIMIT)
+    miner = HyFd(miner_args)
+
+    t0 = time.time()
+    results = miner.verify(fds)
+    logging.info("Verification time: {}s | row checks: {}".format(round(time.time()-t0, 3), miner.row_checks))
+    miner.output.write_verification(results)
+
+    violated = [(lhs, rhs, witness) for lhs, rhs, witness in results if witness is not None]
+    for lhs, rhs, witness in violated:
+        logging.info("{} -> {} does not hold, rows {} and {}".format(lhs, rhs, witness[0], witness[1]))
+    print('{} of {} FDs hold'.format(len(results)-len(violated), len(results)))
+    sys.exit(1 if bool(violated) else 0)
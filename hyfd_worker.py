@@ -0,0 +1,24 @@
+"""
+Worker for the distributed mode of HyFd.
+Holds a hash-shard of the rows and serves the coordinator (hyfd.py -w host:port,...)
+"""
+import logging
+import argparse
+from hyfd_libs.distributed import Worker
+
+FORMAT = "[%(filename)s:%(lineno)s - %(funcName)20s() ] %(message)s"
+
+if __name__ == "__main__":
+    __parser__ = argparse.ArgumentParser(description='HyFD Worker')
+    __parser__.add_argument('-H', '--host', metavar='host', type=str, help='Address to listen on', default='localhost')
+    __parser__.add_argument('-p', '--port', metavar='port', type=int, help='Port to listen on', required=True)
+    __parser__.add_argument('-d', '--debug', help='Debug mode', action='store_true')
+    __parser__.add_argument('-m', '--mute', help='No Output', action='store_true')
+
+    args = __parser__.parse_args()
+    level = logging.DEBUG if args.debug else logging.INFO
+    if args.mute:
+        level = logging.CRITICAL
+    logging.basicConfig( level=level, format=FORMAT )
+
+    Worker().serve((args.host, args.port))